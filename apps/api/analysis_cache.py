@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import hashlib
+from typing import Callable, List, Sequence, Tuple
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+from models import SubmissionAnalysis
+from nlp import analyze_submissions, analyzer_version
+
+Analysis = List[Tuple[int, str, str]]
+# submission ids per cache lookup query
+_LOOKUP_CHUNK = 5000
+
+
+def analyzable(vote: int, comment: str) -> bool:
+    # nlp.analyze_submissions skips neutral votes and blank comments
+    return vote != 0 and bool((comment or "").strip())
+
+
+def content_hash(vote: int, comment: str) -> str:
+    # only the text the analyzer reads counts, so a neutral vote hashes the same
+    # whether or not its comment was loaded (see profiles._COMMENT)
+    text = (comment or "").strip() if vote != 0 else ""
+    raw = f"{vote}\x1f{text}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def load_analyses(
+    db: Session,
+    submissions: Sequence[Tuple[int, int, str]],
+    analyze: Callable[[List[Tuple[int, str]]], List[Analysis]] = analyze_submissions,
+) -> List[Analysis]:
+    """
+    submissions: list of (submission_id, vote, comment)
+    Returns one (polarity, canonical trait, evidence) list per submission.
+    Rows whose vote/comment hash and analyzer_version() match the cache are
+    read back as-is; only new or edited submissions go through `analyze`
+    (nlp.analyze_submissions by default), and their results are written back.
+    """
+    if not submissions:
+        return []
+
+    version = analyzer_version()
+    hashes = [content_hash(vote, comment) for _, vote, comment in submissions]
+    ids = [sid for sid, _, _ in submissions]
+    cached = {}
+    # chunked: one bind parameter per id, and Postgres caps a statement at 65535
+    for start in range(0, len(ids), _LOOKUP_CHUNK):
+        for row in db.query(SubmissionAnalysis).filter(
+            SubmissionAnalysis.submission_id.in_(ids[start:start + _LOOKUP_CHUNK])
+        ):
+            cached[row.submission_id] = row
+
+    out: List[Analysis] = [[] for _ in submissions]
+    misses: List[int] = []
+    for i, (sid, _, _) in enumerate(submissions):
+        row = cached.get(sid)
+        if row is not None and row.content_hash == hashes[i] and row.analyzer_version == version:
+            out[i] = [(pol, trait, evidence) for pol, trait, evidence in row.traits]
+        else:
+            misses.append(i)
+
+    if misses:
+        fresh = analyze([(submissions[i][1], submissions[i][2]) for i in misses])
+        rows = []
+        for i, results in zip(misses, fresh):
+            out[i] = results
+            rows.append({
+                "submission_id": submissions[i][0],
+                "content_hash": hashes[i],
+                "analyzer_version": version,
+                "traits": [list(r) for r in results],
+            })
+        # executemany, not one multi-VALUES statement: SQLAlchemy pages the rows,
+        # so tens of thousands of misses stay under the bind-parameter limit
+        stmt = insert(SubmissionAnalysis)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[SubmissionAnalysis.submission_id],
+            set_={
+                "content_hash": stmt.excluded.content_hash,
+                "analyzer_version": stmt.excluded.analyzer_version,
+                "traits": stmt.excluded.traits,
+                "updated_at": func.now(),
+            },
+        )
+        db.execute(stmt, rows)
+        db.commit()
+
+    return out
+
+
+def purge_stale_analyses(db: Session) -> int:
+    """
+    Drops cache rows written by any other analyzer_version() (code or synonyms.json).
+    load_analyses already ignores them; this just reclaims the space.
+    """
+    n = (
+        db.query(SubmissionAnalysis)
+        .filter(SubmissionAnalysis.analyzer_version != analyzer_version())
+        .delete(synchronize_session=False)
+    )
+    db.commit()
+    return n
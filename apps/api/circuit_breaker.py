@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Callable, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class CircuitOpen(RuntimeError):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure breaker around calls to one dependency.
+      closed     calls go through; `failures` in a row open it
+      open       calls fail fast with CircuitOpen for `reset_seconds`
+      half_open  one probe call goes through: success closes, failure re-opens
+    """
+
+    def __init__(self, name: str, failures: int = 3, reset_seconds: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.failure_threshold = max(failures, 1)
+        self.reset_seconds = reset_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self._counts: Dict[str, int] = {"opened": 0, "rejected": 0}
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if self._clock() - self._opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        # False while open, and in half-open while another caller holds the probe
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            self._counts["rejected"] += 1
+            return False
+
+    def success(self):
+        with self._lock:
+            if self._opened_at is not None:
+                print(f"[breaker] {self.name} closed")
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or (self._opened_at is None and self._failures >= self.failure_threshold):
+                if self._opened_at is None:
+                    print(f"[breaker] {self.name} opened after {self._failures} failures")
+                    self._counts["opened"] += 1
+                self._opened_at = self._clock()
+            self._probing = False
+
+    def call(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        if not self.allow():
+            raise CircuitOpen(f"{self.name} unavailable (circuit open)")
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self.failure()
+            raise
+        self.success()
+        return result
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "state": self._state(),
+                "consecutive_failures": self._failures,
+                "reset_seconds": self.reset_seconds,
+                **self._counts,
+            }
@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows dev boxes: single-process locking only
+    fcntl = None
+
+
+class EmbeddingCache:
+    """
+    Persistent text -> vector cache shared by every worker on the host.
+
+    Layout of `path`:
+      meta.json          model name, dim, dtype, generation
+      vectors-<gen>.bin  raw rows, memory-mapped read-only by readers
+      keys-<gen>.txt     one text digest per line; line i is row i
+      lock               flock'd by writers
+
+    Writers append the vector row before its key line, so any key a reader
+    sees already has its row. When the cache reaches `max_rows` it is
+    compacted into a new generation that keeps the newest half; a different
+    model name, dim or dtype starts an empty generation.
+    """
+
+    def __init__(self, path: str, model_name: str, dim: int, dtype: str = "float32", max_rows: int = 100_000):
+        self.path = path
+        self.model_name = model_name
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self.max_rows = max_rows
+
+        self.hits = 0
+        self.misses = 0
+        self.appends = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._generation: Optional[int] = None
+        self._meta_sig = None
+        self._rows: Dict[str, int] = {}
+        self._n_lines = 0
+        self._keys_offset = 0
+        self._mmap: Optional[np.memmap] = None
+
+        os.makedirs(path, exist_ok=True)
+        with self._file_lock():
+            meta = self._read_meta()
+            if meta is None or not self._compatible(meta):
+                self._start_generation((meta or {}).get("generation", 0) + 1, [], None)
+
+    # -------------------------
+    # public
+    # -------------------------
+
+    def get_many(self, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        with self._lock:
+            self._refresh()
+            out: List[Optional[np.ndarray]] = []
+            for text in texts:
+                row = self._rows.get(_digest(text))
+                if row is None or self._mmap is None or row >= len(self._mmap):
+                    self.misses += 1
+                    out.append(None)
+                else:
+                    self.hits += 1
+                    out.append(np.asarray(self._mmap[row], dtype=np.float32))
+            return out
+
+    def put_many(self, texts: Sequence[str], vectors: Sequence[Sequence[float]]):
+        if not texts:
+            return
+        with self._lock, self._file_lock():
+            if not self._refresh():
+                # another model took over the directory; stop writing to it
+                return
+            fresh = {}
+            for text, vec in zip(texts, vectors):
+                key = _digest(text)
+                if key not in self._rows:
+                    fresh[key] = vec
+            if not fresh:
+                return
+            if len(fresh) > self.max_rows:
+                fresh = dict(list(fresh.items())[-self.max_rows:])
+
+            if len(self._rows) + len(fresh) > self.max_rows:
+                self._compact(keep=min(self.max_rows // 2, self.max_rows - len(fresh)))
+
+            data = np.asarray(list(fresh.values()), dtype=self.dtype).reshape(-1, self.dim)
+            with open(self._vectors_file(self._generation), "ab") as f:
+                f.write(data.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            with open(self._keys_file(self._generation), "a", encoding="ascii") as f:
+                f.write("".join(k + "\n" for k in fresh))
+            self.appends += len(fresh)
+            self._refresh()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "model": self.model_name,
+            "dtype": self.dtype.name,
+            "rows": len(self._rows),
+            "max_rows": self.max_rows,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "appends": self.appends,
+            "evictions": self.evictions,
+        }
+
+    # -------------------------
+    # internals
+    # -------------------------
+
+    @contextmanager
+    def _file_lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.path, "lock"), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _vectors_file(self, gen: int) -> str:
+        return os.path.join(self.path, f"vectors-{gen}.bin")
+
+    def _keys_file(self, gen: int) -> str:
+        return os.path.join(self.path, f"keys-{gen}.txt")
+
+    def _read_meta(self) -> Optional[Dict]:
+        try:
+            with open(os.path.join(self.path, "meta.json"), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _compatible(self, meta: Dict) -> bool:
+        return (
+            meta.get("model") == self.model_name
+            and meta.get("dim") == self.dim
+            and meta.get("dtype") == self.dtype.name
+        )
+
+    def _start_generation(self, gen: int, keys: List[str], data: Optional[np.ndarray]):
+        # caller holds the file lock; readers switch over when meta.json changes
+        with open(self._vectors_file(gen), "wb") as f:
+            if data is not None:
+                f.write(np.ascontiguousarray(data, dtype=self.dtype).tobytes())
+        with open(self._keys_file(gen), "w", encoding="ascii") as f:
+            f.write("".join(k + "\n" for k in keys))
+
+        tmp = os.path.join(self.path, "meta.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"model": self.model_name, "dim": self.dim, "dtype": self.dtype.name, "generation": gen}, f)
+        os.replace(tmp, os.path.join(self.path, "meta.json"))
+
+        # older generations stay readable through existing mappings until unmapped
+        for name in os.listdir(self.path):
+            if name.startswith(("vectors-", "keys-")) and name not in (
+                os.path.basename(self._vectors_file(gen)),
+                os.path.basename(self._keys_file(gen)),
+            ):
+                try:
+                    os.remove(os.path.join(self.path, name))
+                except OSError:
+                    pass
+
+    def _compact(self, keep: int):
+        keys = sorted(self._rows, key=self._rows.get)[-keep:] if keep > 0 else []
+        rows = [self._rows[k] for k in keys]
+        data = np.asarray(self._mmap[rows]) if rows and self._mmap is not None else None
+        self.evictions += len(self._rows) - len(keys)
+        self._start_generation(self._generation + 1, keys, data)
+        self._refresh()
+
+    def _refresh(self) -> bool:
+        # pick up rows appended (or generations started) by other processes;
+        # False when the directory now belongs to another model/dim/dtype
+        meta_file = os.path.join(self.path, "meta.json")
+        try:
+            st = os.stat(meta_file)
+        except OSError:
+            return False
+        # meta.json is only ever replaced, so a new inode means a new generation
+        sig = (st.st_ino, st.st_mtime_ns)
+        if sig != self._meta_sig or self._generation is None:
+            meta = self._read_meta()
+            if meta is None or not self._compatible(meta):
+                return False
+            self._meta_sig = sig
+            if meta["generation"] != self._generation:
+                self._generation = meta["generation"]
+                self._rows = {}
+                self._n_lines = 0
+                self._keys_offset = 0
+                self._mmap = None
+
+        keys_file = self._keys_file(self._generation)
+        try:
+            size = os.path.getsize(keys_file)
+        except OSError:
+            return False
+        if size > self._keys_offset:
+            with open(keys_file, "r", encoding="ascii") as f:
+                f.seek(self._keys_offset)
+                chunk = f.read()
+            # ignore a trailing partial line; it is re-read next time
+            complete = chunk[: chunk.rfind("\n") + 1]
+            for key in complete.splitlines():
+                self._rows.setdefault(key, self._n_lines)
+                self._n_lines += 1
+            self._keys_offset += len(complete)
+
+        n = self._n_lines
+        if n and (self._mmap is None or len(self._mmap) < n):
+            self._mmap = np.memmap(self._vectors_file(self._generation), dtype=self.dtype, mode="r", shape=(n, self.dim))
+        return True
+
+
+def _digest(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
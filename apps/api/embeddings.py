@@ -1,10 +1,152 @@
 from __future__ import annotations
-from typing import List
-from sentence_transformers import SentenceTransformer
+import os
+import threading
+from typing import Dict, List, Optional
 
-_MODEL = SentenceTransformer("all-MiniLM-L6-v2")
+import numpy as np
 
-def embed_texts(texts: List[str]) -> List[List[float]]:
+from embedding_cache import EmbeddingCache
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+HF_MODEL_ID = f"sentence-transformers/{MODEL_NAME}"
+MAX_SEQ_LENGTH = 256  # same truncation as the sentence-transformers model
+# output size of MODEL_NAME; sizes the cache without loading the model
+EMBED_DIM = 384
+
+# "torch" (SentenceTransformer) or "onnx" (int8 export, see scripts/export_onnx.py)
+EMBED_BACKEND = os.getenv("EMBED_BACKEND", "torch")
+EMBED_ONNX_PATH = os.getenv("EMBED_ONNX_PATH", f"models/{MODEL_NAME}-int8.onnx")
+EMBED_ONNX_THREADS = int(os.getenv("EMBED_ONNX_THREADS", "0"))  # 0 = onnxruntime default
+
+
+class OnnxEncoder:
+    """
+    Same encode() contract as SentenceTransformer for the MiniLM export:
+    token embeddings -> attention-masked mean pooling -> optional L2 norm.
+    """
+
+    def __init__(self, path: str, intra_op_threads: int = 0):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        opts.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        if intra_op_threads > 0:
+            opts.intra_op_num_threads = intra_op_threads
+        opts.inter_op_num_threads = 1
+
+        self._session = ort.InferenceSession(path, sess_options=opts, providers=["CPUExecutionProvider"])
+        self._input_names = {i.name for i in self._session.get_inputs()}
+        self._tokenizer = AutoTokenizer.from_pretrained(HF_MODEL_ID)
+
+        dim = self._session.get_outputs()[0].shape[-1]
+        self._dim = dim if isinstance(dim, int) else EMBED_DIM
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self._dim
+
+    def encode(self, texts: List[str], batch_size: int = 32, normalize_embeddings: bool = False) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.get_sentence_embedding_dimension()), dtype=np.float32)
+
+        # length-sorted batches keep padding small, like SentenceTransformer.encode
+        order = np.argsort([-len(t) for t in texts], kind="stable")
+        out = np.zeros((len(texts), self.get_sentence_embedding_dimension()), dtype=np.float32)
+        for start in range(0, len(texts), batch_size):
+            idx = order[start:start + batch_size]
+            enc = self._tokenizer(
+                [texts[i] for i in idx],
+                padding=True,
+                truncation=True,
+                max_length=MAX_SEQ_LENGTH,
+                return_tensors="np",
+            )
+            feeds = {k: v.astype(np.int64) for k, v in enc.items() if k in self._input_names}
+            tokens = self._session.run(None, feeds)[0]
+
+            mask = enc["attention_mask"][..., None].astype(np.float32)
+            pooled = (tokens * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            out[idx] = pooled
+
+        if normalize_embeddings:
+            out /= np.clip(np.linalg.norm(out, axis=1, keepdims=True), 1e-12, None)
+        return out
+
+
+def load_model(backend: str = EMBED_BACKEND):
+    if backend == "onnx":
+        return OnnxEncoder(EMBED_ONNX_PATH, intra_op_threads=EMBED_ONNX_THREADS)
+    if backend == "torch":
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(MODEL_NAME)
+    raise ValueError(f"unknown EMBED_BACKEND {backend!r} (expected 'torch' or 'onnx')")
+
+
+# persistent text -> vector cache shared by all workers; EMBED_CACHE_DIR="" disables it
+_CACHE_DIR = os.getenv("EMBED_CACHE_DIR", ".embed_cache")
+
+# both loaded on first use (or by warmup.py in the background)
+_MODEL = None
+_CACHE: Optional[EmbeddingCache] = None
+_LOAD_LOCK = threading.Lock()
+
+
+def get_model():
+    global _MODEL
+    if _MODEL is None:
+        with _LOAD_LOCK:
+            if _MODEL is None:
+                model = load_model()
+                dim = model.get_sentence_embedding_dimension()
+                if dim != EMBED_DIM:
+                    raise ValueError(f"{MODEL_NAME} returned {dim}-dim vectors, expected EMBED_DIM={EMBED_DIM}")
+                _MODEL = model
+    return _MODEL
+
+
+def get_cache() -> Optional[EmbeddingCache]:
+    global _CACHE
+    # no get_model() here: a lookup that's all hits never loads torch / onnx
+    if _CACHE is None and _CACHE_DIR:
+        with _LOAD_LOCK:
+            if _CACHE is None:
+                _CACHE = EmbeddingCache(
+                    _CACHE_DIR,
+                    # int8 onnx vectors differ slightly from torch ones; never mix them
+                    model_name=f"{MODEL_NAME}:{EMBED_BACKEND}",
+                    dim=EMBED_DIM,
+                    dtype=os.getenv("EMBED_CACHE_DTYPE", "float32"),
+                    max_rows=int(os.getenv("EMBED_CACHE_MAX_ROWS", "100000")),
+                )
+    return _CACHE
+
+
+def _encode(texts: List[str]) -> List[List[float]]:
     # normalize_embeddings makes cosine similarity easier
-    vectors = _MODEL.encode(texts, normalize_embeddings=True)
+    vectors = get_model().encode(texts, normalize_embeddings=True)
     return vectors.tolist()
+
+
+def embed_texts(texts: List[str]) -> List[List[float]]:
+    cache = get_cache()
+    if cache is None or not texts:
+        return _encode(texts)
+
+    cached = cache.get_many(texts)
+    missing = list(dict.fromkeys(t for t, v in zip(texts, cached) if v is None))
+    fresh: Dict[str, List[float]] = {}
+    if missing:
+        fresh = dict(zip(missing, _encode(missing)))
+        cache.put_many(missing, [fresh[t] for t in missing])
+
+    return [v.tolist() if v is not None else fresh[t] for t, v in zip(texts, cached)]
+
+
+def cache_stats() -> Dict:
+    # doesn't force the model to load just to report stats
+    if not _CACHE_DIR:
+        return {"enabled": False}
+    if _CACHE is None:
+        return {"enabled": True, "loaded": False}
+    return _CACHE.stats()
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import hashlib
+from typing import Dict, Optional, Sequence
+
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+from models import Candidate, CandidateProfile, ProfileJob, Submission
+import profiles
+
+# Version tokens for conditional GETs. Each one is a few index-backed
+# aggregates over the rows a response is built from, so a matching
+# If-None-Match is answered with 304 before any profile work or row
+# serialization happens.
+
+
+def etag(*parts) -> str:
+    digest = hashlib.sha256("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()[:20]
+    return f'"{digest}"'
+
+
+def matches(if_none_match: Optional[str], tag: str) -> bool:
+    # RFC 9110 weak comparison: any listed tag (W/ or not) or "*"
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == tag:
+            return True
+    return False
+
+
+def submissions_tag(db: Session, candidate_id: int) -> str:
+    # inserts and deletes move the count, edits move max(updated_at)
+    n, last = (
+        db.query(func.count(Submission.id), func.max(Submission.updated_at))
+        .filter(Submission.candidate_id == candidate_id)
+        .one()
+    )
+    return etag("submissions", candidate_id, n, last)
+
+
+def candidates_tag(db: Session, event_id: int, summary: bool = False, user_id: Optional[str] = None) -> str:
+    # with `summary` the body also carries vote counts and the caller's own vote
+    n, last = (
+        db.query(func.count(Candidate.id), func.max(Candidate.updated_at))
+        .filter(Candidate.event_id == event_id)
+        .one()
+    )
+    if not summary:
+        return etag("candidates", event_id, n, last)
+    votes, voted = (
+        db.query(func.count(Submission.id), func.max(Submission.updated_at))
+        .join(Candidate, Candidate.id == Submission.candidate_id)
+        .filter(Candidate.event_id == event_id)
+        .one()
+    )
+    return etag("candidates", event_id, n, last, "votes", user_id, votes, voted)
+
+
+def profiles_tag(db: Session, candidate_ids: Sequence[int], top_k: int) -> Optional[str]:
+    """
+    Tag of the materialized profiles, or None while any of them still has to
+    be built or has changes pending (the body is about to move; no tag).
+    """
+    if not candidate_ids:
+        return etag("profiles", top_k)
+    computed: Dict[int, object] = dict(
+        db.query(CandidateProfile.candidate_id, CandidateProfile.updated_at)
+        .filter(CandidateProfile.candidate_id.in_(candidate_ids))
+        .all()
+    )
+    if len(computed) < len(set(candidate_ids)):
+        return None
+    pending = db.query(ProfileJob.candidate_id).filter(ProfileJob.candidate_id.in_(candidate_ids)).first()
+    if pending is not None:
+        return None
+    degraded = profiles.ungrouped_candidates(db, candidate_ids)
+    return etag("profiles", top_k, *((cid, computed[cid], cid in degraded) for cid in candidate_ids))
@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import threading
+from typing import Dict, Optional, Set
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from db import engine
+from models import Candidate, CandidateProfile
+import profiles
+
+# Per-event live channel behind GET /events/{event_id}/live (SSE). Writes
+# publish one compact delta after they commit; every open page on that event
+# gets it pushed, so server work grows with writes, not viewers x refresh rate.
+#   LIVE_BACKEND=memory    deltas reach subscribers of this process only
+#   LIVE_BACKEND=postgres  deltas go through NOTIFY on LIVE_CHANNEL, so writes
+#                          from any process (other API workers,
+#                          scripts/profile_worker.py) reach every API process,
+#                          which LISTENs and fans them out to its subscribers
+LIVE_BACKEND = os.getenv("LIVE_BACKEND", "memory")
+LIVE_CHANNEL = os.getenv("LIVE_CHANNEL", "event_live")
+# undelivered deltas per subscriber; past that it gets one "resync" instead
+LIVE_QUEUE_SIZE = int(os.getenv("LIVE_QUEUE_SIZE", "100"))
+LIVE_KEEPALIVE_SECONDS = float(os.getenv("LIVE_KEEPALIVE_SECONDS", "15"))
+
+RESYNC = {"type": "resync"}
+
+
+class Subscription:
+    # one open stream; lives on the event loop that serves it
+    def __init__(self, event_id: int, loop: asyncio.AbstractEventLoop):
+        self.event_id = event_id
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=LIVE_QUEUE_SIZE)
+
+    def _put(self, message: Dict):
+        # on the loop: a reader that fell behind drops its backlog for one resync
+        if self.queue.full():
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+            _count("dropped")
+            return
+        self.queue.put_nowait(message)
+
+    async def get(self, timeout: float) -> Optional[Dict]:
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+_subs: Dict[int, Set[Subscription]] = {}
+_subs_lock = threading.Lock()
+_counters: Dict[str, int] = {"published": 0, "delivered": 0, "dropped": 0}
+_counter_lock = threading.Lock()
+_listener: Optional[threading.Thread] = None
+_stop = threading.Event()
+
+
+def _count(key: str, n: int = 1):
+    with _counter_lock:
+        _counters[key] += n
+
+
+def subscribe(event_id: int) -> Subscription:
+    # call from the event loop serving the stream
+    sub = Subscription(event_id, asyncio.get_running_loop())
+    with _subs_lock:
+        _subs.setdefault(event_id, set()).add(sub)
+    return sub
+
+
+def unsubscribe(sub: Subscription):
+    with _subs_lock:
+        subs = _subs.get(sub.event_id)
+        if subs is not None:
+            subs.discard(sub)
+            if not subs:
+                del _subs[sub.event_id]
+
+
+def dispatch(event_id: int, message: Dict):
+    # fans a delta out to this process's subscribers; safe from any thread
+    with _subs_lock:
+        subs = list(_subs.get(event_id, ()))
+    for sub in subs:
+        try:
+            sub.loop.call_soon_threadsafe(sub._put, message)
+        except RuntimeError:
+            unsubscribe(sub)  # its loop is gone
+    _count("delivered", len(subs))
+
+
+def publish(event_id: Optional[int], message: Dict):
+    """
+    Sends `message` to everyone watching `event_id`. Call after the write
+    committed. Never raises: a lost delta only means a page misses one
+    update until its next resync.
+    """
+    if event_id is None:
+        return
+    _count("published")
+    if LIVE_BACKEND != "postgres":
+        dispatch(event_id, message)
+        return
+    payload = json.dumps({"event_id": event_id, "message": message}, default=str)
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": LIVE_CHANNEL, "payload": payload})
+            conn.commit()
+    except Exception as e:
+        print(f"[live] notify failed for event {event_id}: {e!r}")
+
+
+# -------------------------
+# Deltas
+# -------------------------
+
+def _profile_version(db: Session, candidate_id: int) -> Optional[str]:
+    computed = db.query(CandidateProfile.updated_at).filter(CandidateProfile.candidate_id == candidate_id).scalar()
+    return computed.isoformat() if computed is not None else None
+
+
+def publish_votes(db: Session, candidate_id: int, event_id: Optional[int]):
+    # new vote counts after a submission write; the profile recompute is queued
+    if event_id is None:
+        return
+    try:
+        votes = profiles.vote_summaries(db, [candidate_id])[candidate_id]
+        version = _profile_version(db, candidate_id)
+    except Exception as e:
+        print(f"[live] vote delta for candidate {candidate_id} failed: {e!r}")
+        return
+    publish(event_id, {
+        "type": "votes",
+        "candidate_id": candidate_id,
+        # no my_vote / my_comment: the same delta goes to every viewer
+        "votes": {k: v for k, v in votes.items() if not k.startswith("my_")},
+        "profile_version": version,
+        "profile_pending": True,
+    })
+
+
+def publish_profile(db: Session, candidate_id: int):
+    # a background recompute finished
+    try:
+        event_id = db.query(Candidate.event_id).filter(Candidate.id == candidate_id).scalar()
+        version = _profile_version(db, candidate_id)
+    except Exception as e:
+        print(f"[live] profile delta for candidate {candidate_id} failed: {e!r}")
+        return
+    publish(event_id, {"type": "profile", "candidate_id": candidate_id, "profile_version": version})
+
+
+def publish_candidate(event_id: Optional[int], action: str, candidate_id: int, name: str):
+    # created / updated / deleted; the photo itself isn't pushed
+    publish(event_id, {"type": "candidate", "action": action, "candidate_id": candidate_id, "name": name})
+
+
+def publish_members(event_id: int, action: str, user_id: str):
+    publish(event_id, {"type": "members", "action": action, "user_id": user_id})
+
+
+# -------------------------
+# Postgres LISTEN
+# -------------------------
+
+def _listen(stop: threading.Event):
+    import psycopg
+
+    dsn = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+    while not stop.is_set():
+        try:
+            with psycopg.connect(dsn, autocommit=True) as conn:
+                conn.execute(f'LISTEN "{LIVE_CHANNEL}"')
+                print(f"[live] listening on {LIVE_CHANNEL}")
+                while not stop.is_set():
+                    for note in conn.notifies(timeout=1.0):
+                        try:
+                            body = json.loads(note.payload)
+                            dispatch(int(body["event_id"]), body["message"])
+                        except Exception as e:
+                            print(f"[live] bad notification {note.payload[:200]!r}: {e!r}")
+        except Exception as e:
+            print(f"[live] listener error, reconnecting: {e!r}")
+            # subscribers may have missed deltas while disconnected
+            with _subs_lock:
+                watched = list(_subs)
+            for event_id in watched:
+                dispatch(event_id, RESYNC)
+            stop.wait(2.0)
+
+
+def start():
+    # the LISTEN thread; only needed where streams are served
+    global _listener
+    if LIVE_BACKEND != "postgres" or _listener is not None:
+        return
+    _stop.clear()
+    _listener = threading.Thread(target=_listen, args=(_stop,), name="live-listen", daemon=True)
+    _listener.start()
+
+
+def stop(timeout: Optional[float] = 5):
+    global _listener
+    _stop.set()
+    if _listener is not None:
+        _listener.join(timeout)
+        _listener = None
+
+
+def stats() -> Dict:
+    with _counter_lock:
+        out = dict(_counters)
+    with _subs_lock:
+        out["subscribers"] = sum(len(s) for s in _subs.values())
+        out["events"] = len(_subs)
+    out["backend"] = LIVE_BACKEND
+    return out
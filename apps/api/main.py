@@ -1,24 +1,53 @@
 from dotenv import load_dotenv
 load_dotenv()
 
-import os, secrets
-from fastapi import FastAPI, Depends, HTTPException, Header
+import warmup  # first, so startup timings start at process import
+
+import os, secrets, json
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, HTTPException, Header, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 
 from db import SessionLocal
 from models import Candidate, Submission, Event, EventMembership, EventInvite
 from schemas import (
-    CandidateCreate, CandidateOut, CandidateUpdate,
+    CandidateCreate, CandidateOut, CandidateUpdate, CandidateWithVotesOut,
     SubmissionCreate, SubmissionOut,
     CandidateProfileOut, VoteSummary, TraitItem,
     EventCreate, EventOut, EventMeOut,
     MemberAdd, MemberOut, MemberDetailOut,
     InviteCreate, InviteOut, InvitePublicOut,
 )
-from nlp import build_profile
-
-app = FastAPI()
+import profiles
+import profile_jobs
+import profile_pool
+import embeddings
+import etags
+import live
+import nlp
+import qdrant_utils
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # models load in the background behind /ready: the pool workers' own, plus
+    # whatever NLP runs in this process (see warmup.load_all); with
+    # EAGER_LOAD_MODELS=0 they load on first NLP use instead
+    if warmup.EAGER_LOAD_MODELS:
+        warmup.start_background()
+        profile_pool.start()
+    # submissions only enqueue profile recomputes; these threads apply them
+    profile_jobs.start_workers()
+    live.start()
+    yield
+    live.stop()
+    profile_jobs.stop_workers()
+    profile_pool.shutdown()
+    qdrant_utils.close_store()
+
+app = FastAPI(lifespan=lifespan)
 
 _default_origins = "http://localhost:3000,http://localhost:3001"
 _allowed_origins = [o.strip() for o in os.getenv("ALLOWED_ORIGINS", _default_origins).split(",") if o.strip()]
@@ -29,6 +58,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
 def get_db():
@@ -62,11 +92,71 @@ def require_organizer(m: EventMembership):
     if m.role != "organizer":
         raise HTTPException(status_code=403, detail="Organizer only")
 
+def load_profiles(db: Session, candidate_ids: list[int], top_k: int = 8) -> dict:
+    # profiles.get_profiles, with profile-pool pressure mapped to HTTP errors
+    try:
+        profs = profiles.get_profiles(db, candidate_ids, top_k=top_k)
+    except profile_pool.PoolBusy:
+        raise HTTPException(status_code=503, detail="Profile workers busy, retry shortly", headers={"Retry-After": "2"})
+    except profile_pool.TaskTimeout:
+        raise HTTPException(status_code=504, detail="Profile build timed out")
+    except profile_pool.PoolBroken:
+        raise HTTPException(status_code=503, detail="Profile workers restarting, retry shortly", headers={"Retry-After": "5"})
+    queue_regrouping(db, profs)
+    return profs
+
+
+def not_modified(if_none_match: str | None, tag: str | None) -> Response | None:
+    # 304 for a conditional GET whose tag still matches; None = build the body
+    if tag and etags.matches(if_none_match, tag):
+        return Response(status_code=304, headers={"ETag": tag, "Cache-Control": "no-cache"})
+    return None
+
+
+def set_etag(response: Response, tag: str | None):
+    # clients may keep the body but must revalidate it every time
+    if tag:
+        response.headers["ETag"] = tag
+        response.headers["Cache-Control"] = "no-cache"
+
+
+def with_votes(db: Session, cands: list[Candidate], user_id: str | None) -> list[dict]:
+    votes = profiles.vote_summaries(db, [c.id for c in cands], user_id)
+    return [
+        {**CandidateOut.model_validate(c).model_dump(), "votes": votes[c.id]}
+        for c in cands
+    ]
+
+
+def queue_regrouping(db: Session, profs: dict):
+    # a profile built while the vector store was down gets a job to regroup it
+    stranded = [cid for cid, prof in profs.items() if prof["degraded"] and not prof["pending"]]
+    for cid in stranded:
+        profile_jobs.enqueue(db, cid)
+    if stranded:
+        db.commit()
+
 
 @app.get("/")
 def root():
     return {"status": "API running"}
 
+@app.get("/ready")
+def ready():
+    body = warmup.status()
+    return JSONResponse(body, status_code=200 if body["ready"] else 503)
+
+@app.get("/metrics")
+def metrics():
+    return {
+        "embedding_cache": embeddings.cache_stats(),
+        "polarity": nlp.polarity_stats(),
+        "vector_store": qdrant_utils.store_stats(),
+        "profile_pool": profile_pool.stats(),
+        "profile_queue": profile_jobs.stats(),
+        "live": live.stats(),
+    }
+
 
 # -------------------------
 # EVENTS + MEMBERSHIPS
@@ -152,11 +242,13 @@ def add_member(
     if existing:
         existing.role = payload.role
         db.commit()
+        live.publish_members(event_id, "updated", existing.user_id)
         return {"user_id": existing.user_id, "role": existing.role}
 
     m = EventMembership(event_id=event_id, user_id=target_user, role=payload.role)
     db.add(m)
     db.commit()
+    live.publish_members(event_id, "added", m.user_id)
     return {"user_id": m.user_id, "role": m.role}
 
 @app.patch("/events/{event_id}/members/{target_user_id}", response_model=MemberOut)
@@ -180,6 +272,7 @@ def update_member_role(
 
     m.role = payload.role
     db.commit()
+    live.publish_members(event_id, "updated", m.user_id)
     return {"user_id": m.user_id, "role": m.role}
 
 @app.get("/events/{event_id}/members", response_model=list[MemberDetailOut])
@@ -208,6 +301,7 @@ def remove_member(
         raise HTTPException(status_code=404, detail="Member not found")
     db.delete(m)
     db.commit()
+    live.publish_members(event_id, "removed", target_user_id)
 
 
 # -------------------------
@@ -314,6 +408,7 @@ def accept_invite(
     inv.accepted_at = datetime.now(timezone.utc)
     inv.accepted_by = user_id
     db.commit()
+    live.publish_members(inv.event_id, "updated" if existing else "added", user_id)
     return {"user_id": user_id, "role": inv.role}
 
 
@@ -321,19 +416,86 @@ def accept_invite(
 # EVENT-SCOPED CANDIDATES
 # -------------------------
 
-@app.get("/events/{event_id}/candidates", response_model=list[CandidateOut])
+@app.get("/events/{event_id}/candidates", response_model=list[CandidateWithVotesOut])
 def list_event_candidates(
     event_id: int,
+    response: Response,
+    summary: bool = False,
     db: Session = Depends(get_db),
     user_id: str = Depends(require_user_id),
+    if_none_match: str | None = Header(default=None),
 ):
+    # ?summary=true adds each candidate's vote counts and the caller's own vote
+    # (one GROUP BY), so dashboards don't fetch every candidate's submissions
     require_member(db, event_id, user_id)
-    return (
+    tag = etags.candidates_tag(db, event_id, summary=summary, user_id=user_id)
+    cached = not_modified(if_none_match, tag)
+    if cached is not None:
+        return cached
+    set_etag(response, tag)
+    cands = (
         db.query(Candidate)
         .filter(Candidate.event_id == event_id)
         .order_by(Candidate.created_at.desc())
         .all()
     )
+    return with_votes(db, cands, user_id) if summary else cands
+
+@app.get("/events/{event_id}/profiles", response_model=list[CandidateProfileOut])
+def event_profiles(
+    event_id: int,
+    response: Response,
+    db: Session = Depends(get_db),
+    user_id: str = Depends(require_user_id),
+    if_none_match: str | None = Header(default=None),
+):
+    # every candidate's profile in one response; never-built ones are built in one batch
+    require_member(db, event_id, user_id)
+    ids = [
+        cid for (cid,) in
+        db.query(Candidate.id)
+        .filter(Candidate.event_id == event_id)
+        .order_by(Candidate.created_at.desc())
+    ]
+    tag = etags.profiles_tag(db, ids, top_k=8)
+    cached = not_modified(if_none_match, tag)
+    if cached is not None:
+        return cached
+    profs = load_profiles(db, ids, top_k=8)
+    set_etag(response, tag or etags.profiles_tag(db, ids, top_k=8))
+    return [{"candidate_id": cid, **profs[cid]} for cid in ids]
+
+@app.get("/events/{event_id}/live")
+def event_live(
+    event_id: int,
+    db: Session = Depends(get_db, scope="function"),
+    user_id: str = Depends(require_user_id),
+):
+    # server-sent events for one event page: `votes`, `profile`, `candidate` and
+    # `members` deltas as writes commit (see live.py); `resync` means deltas were
+    # missed and the page should refetch. Comment lines keep proxies from idling out.
+    # The session is function-scoped: it goes back to the pool before streaming
+    # starts, so open pages don't hold connections.
+    require_member(db, event_id, user_id)
+
+    async def events():
+        sub = live.subscribe(event_id)
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                message = await sub.get(live.LIVE_KEEPALIVE_SECONDS)
+                if message is None:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: {message['type']}\ndata: {json.dumps(jsonable_encoder(message))}\n\n"
+        finally:
+            live.unsubscribe(sub)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @app.post("/events/{event_id}/candidates", response_model=CandidateOut)
 def create_event_candidate(
@@ -353,6 +515,7 @@ def create_event_candidate(
     db.add(c)
     db.commit()
     db.refresh(c)
+    live.publish_candidate(event_id, "created", c.id, c.name)
     return c
 
 
@@ -361,9 +524,14 @@ def create_event_candidate(
 # Eventually you’ll remove /candidates global list.
 # -------------------------
 
-@app.get("/candidates", response_model=list[CandidateOut])
-def list_candidates(db: Session = Depends(get_db)):
-    return db.query(Candidate).order_by(Candidate.created_at.desc()).all()
+@app.get("/candidates", response_model=list[CandidateWithVotesOut])
+def list_candidates(
+    summary: bool = False,
+    db: Session = Depends(get_db),
+    user_id: str = Depends(require_user_id),
+):
+    cands = db.query(Candidate).order_by(Candidate.created_at.desc()).all()
+    return with_votes(db, cands, user_id) if summary else cands
 
 @app.patch("/candidates/{candidate_id}", response_model=CandidateOut)
 def update_candidate(
@@ -390,6 +558,7 @@ def update_candidate(
 
     db.commit()
     db.refresh(c)
+    live.publish_candidate(c.event_id, "updated", c.id, c.name)
     return c
 
 @app.delete("/candidates/{candidate_id}")
@@ -406,8 +575,10 @@ def delete_candidate(
         m = require_member(db, c.event_id, user_id)
         require_can_edit(m)
 
+    event_id, name = c.event_id, c.name
     db.delete(c)
     db.commit()
+    live.publish_candidate(event_id, "deleted", candidate_id, name)
     return {"status": "deleted", "candidate_id": candidate_id}
 
 
@@ -441,24 +612,58 @@ def upsert_submission(
         .first()
     )
 
+    # the profile is recomputed in the background (profile_jobs), committed with the vote
     if existing:
         existing.vote = payload.vote
         existing.comment = comment
+        profile_jobs.enqueue(db, candidate_id)
         db.commit()
         db.refresh(existing)
+        live.publish_votes(db, candidate_id, c.event_id)
         return existing
 
     s = Submission(candidate_id=candidate_id, user_id=user_id, vote=payload.vote, comment=comment)
     db.add(s)
+    profile_jobs.enqueue(db, candidate_id)
     db.commit()
     db.refresh(s)
+    live.publish_votes(db, candidate_id, c.event_id)
     return s
 
+@app.delete("/candidates/{candidate_id}/submissions", status_code=204)
+def delete_my_submission(
+    candidate_id: int,
+    db: Session = Depends(get_db),
+    user_id: str = Depends(require_user_id),
+):
+    s = (
+        db.query(Submission)
+        .filter(Submission.candidate_id == candidate_id, Submission.user_id == user_id)
+        .first()
+    )
+    if not s:
+        raise HTTPException(status_code=404, detail="Submission not found")
+    db.delete(s)
+    profile_jobs.enqueue(db, candidate_id)
+    db.commit()
+    event_id = db.query(Candidate.event_id).filter(Candidate.id == candidate_id).scalar()
+    live.publish_votes(db, candidate_id, event_id)
+
 @app.get("/candidates/{candidate_id}/submissions", response_model=list[SubmissionOut])
-def list_submissions(candidate_id: int, db: Session = Depends(get_db)):
+def list_submissions(
+    candidate_id: int,
+    response: Response,
+    db: Session = Depends(get_db),
+    if_none_match: str | None = Header(default=None),
+):
     c = db.query(Candidate).filter(Candidate.id == candidate_id).first()
     if not c:
         raise HTTPException(status_code=404, detail="Candidate not found")
+    tag = etags.submissions_tag(db, candidate_id)
+    cached = not_modified(if_none_match, tag)
+    if cached is not None:
+        return cached
+    set_etag(response, tag)
     return (
         db.query(Submission)
         .filter(Submission.candidate_id == candidate_id)
@@ -467,29 +672,63 @@ def list_submissions(candidate_id: int, db: Session = Depends(get_db)):
     )
 
 @app.get("/candidates/{candidate_id}/profile", response_model=CandidateProfileOut)
-def candidate_profile(candidate_id: int, db: Session = Depends(get_db)):
+def candidate_profile(
+    candidate_id: int,
+    response: Response,
+    db: Session = Depends(get_db),
+    if_none_match: str | None = Header(default=None),
+):
     c = db.query(Candidate).filter(Candidate.id == candidate_id).first()
     if not c:
         raise HTTPException(status_code=404, detail="Candidate not found")
 
-    subs = (
-        db.query(Submission)
-        .filter(Submission.candidate_id == candidate_id)
-        .order_by(Submission.created_at.desc())
-        .all()
-    )
-
-    yes = sum(1 for s in subs if s.vote == 1)
-    neutral = sum(1 for s in subs if s.vote == 0)
-    no = sum(1 for s in subs if s.vote == -1)
-    score = yes - no
+    # unchanged since the client's copy: no profile read at all
+    tag = etags.profiles_tag(db, [candidate_id], top_k=8)
+    cached = not_modified(if_none_match, tag)
+    if cached is not None:
+        return cached
 
-    pairs = [(s.vote, s.comment) for s in subs]
-    prof = build_profile(pairs, top_k=8)
+    prof = load_profiles(db, [candidate_id], top_k=8)[candidate_id]
+    set_etag(response, tag or etags.profiles_tag(db, [candidate_id], top_k=8))
 
     return {
         "candidate_id": candidate_id,
-        "vote_summary": {"yes": yes, "neutral": neutral, "no": no, "score": score},
+        "vote_summary": prof["vote_summary"],
         "positives": prof["positives"],
         "negatives": prof["negatives"],
-    }
\ No newline at end of file
+        "computed_at": prof["computed_at"],
+        "pending": prof["pending"],
+        "stale_seconds": prof["stale_seconds"],
+        "degraded": prof["degraded"],
+    }
+
+@app.get("/candidates/{candidate_id}/profile/stream")
+def candidate_profile_stream(candidate_id: int, db: Session = Depends(get_db, scope="function")):
+    # server-sent events: `summary` (vote counts) right away, `partial` top-k
+    # traits as batches of submissions are analyzed, then `final` with the
+    # same body as GET /candidates/{candidate_id}/profile (or `error`).
+    # `db` only serves the 404 check and is closed before streaming starts
+    c = db.query(Candidate).filter(Candidate.id == candidate_id).first()
+    if not c:
+        raise HTTPException(status_code=404, detail="Candidate not found")
+
+    def sse(event: str, data: dict) -> str:
+        return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+    def events():
+        # own session, opened when streaming starts: the function-scoped one is closed by then
+        with SessionLocal() as stream_db:
+            try:
+                for event, data in profiles.iter_build(stream_db, candidate_id, top_k=8):
+                    if event == "final":
+                        queue_regrouping(stream_db, {candidate_id: data})
+                        data = CandidateProfileOut(candidate_id=candidate_id, **data)
+                    yield sse(event, data)
+            except (profile_pool.PoolBusy, profile_pool.TaskTimeout, profile_pool.PoolBroken) as e:
+                yield sse("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
\ No newline at end of file
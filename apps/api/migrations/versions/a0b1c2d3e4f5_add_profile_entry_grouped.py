@@ -0,0 +1,26 @@
+"""add candidate_profile_entries.grouped
+
+Revision ID: a0b1c2d3e4f5
+Revises: f9a0b1c2d3e4
+Create Date: 2026-10-17 03:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = 'a0b1c2d3e4f5'
+down_revision: Union[str, Sequence[str], None] = 'f9a0b1c2d3e4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'candidate_profile_entries',
+        sa.Column('grouped', sa.Boolean(), server_default=sa.true(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('candidate_profile_entries', 'grouped')
@@ -0,0 +1,28 @@
+"""add candidates.updated_at
+
+Revision ID: b1c2d3e4f5a6
+Revises: a0b1c2d3e4f5
+Create Date: 2026-10-17 04:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = 'b1c2d3e4f5a6'
+down_revision: Union[str, Sequence[str], None] = 'a0b1c2d3e4f5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'candidates',
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    )
+    op.create_index('ix_candidates_event_id', 'candidates', ['event_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_candidates_event_id', table_name='candidates')
+    op.drop_column('candidates', 'updated_at')
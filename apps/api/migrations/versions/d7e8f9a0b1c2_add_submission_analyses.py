@@ -0,0 +1,33 @@
+"""add submission_analyses cache table
+
+Revision ID: d7e8f9a0b1c2
+Revises: c5d6e7f8a9b0
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = 'd7e8f9a0b1c2'
+down_revision: Union[str, Sequence[str], None] = 'c5d6e7f8a9b0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'submission_analyses',
+        sa.Column('submission_id', sa.Integer(), nullable=False),
+        sa.Column('content_hash', sa.String(length=64), nullable=False),
+        sa.Column('analyzer_version', sa.String(length=32), nullable=False),
+        sa.Column('traits', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['submission_id'], ['submissions.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('submission_id'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('submission_analyses')
@@ -0,0 +1,50 @@
+"""add materialized candidate_profiles
+
+Revision ID: e8f9a0b1c2d3
+Revises: d7e8f9a0b1c2
+Create Date: 2026-10-17 01:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = 'e8f9a0b1c2d3'
+down_revision: Union[str, Sequence[str], None] = 'd7e8f9a0b1c2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'candidate_profiles',
+        sa.Column('candidate_id', sa.Integer(), nullable=False),
+        sa.Column('yes', sa.Integer(), nullable=False),
+        sa.Column('neutral', sa.Integer(), nullable=False),
+        sa.Column('no', sa.Integer(), nullable=False),
+        sa.Column('pos_counts', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column('neg_counts', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column('pos_examples', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column('neg_examples', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['candidate_id'], ['candidates.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('candidate_id'),
+    )
+    op.create_table(
+        'candidate_profile_entries',
+        sa.Column('submission_id', sa.Integer(), nullable=False),
+        sa.Column('candidate_id', sa.Integer(), nullable=False),
+        sa.Column('vote', sa.Integer(), nullable=False),
+        sa.Column('content_hash', sa.String(length=64), nullable=False),
+        sa.Column('traits', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.ForeignKeyConstraint(['candidate_id'], ['candidates.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('submission_id'),
+    )
+    op.create_index('ix_candidate_profile_entries_candidate_id', 'candidate_profile_entries', ['candidate_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_candidate_profile_entries_candidate_id', table_name='candidate_profile_entries')
+    op.drop_table('candidate_profile_entries')
+    op.drop_table('candidate_profiles')
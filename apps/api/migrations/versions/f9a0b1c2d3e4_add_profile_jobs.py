@@ -0,0 +1,35 @@
+"""add profile_jobs queue
+
+Revision ID: f9a0b1c2d3e4
+Revises: e8f9a0b1c2d3
+Create Date: 2026-10-17 02:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = 'f9a0b1c2d3e4'
+down_revision: Union[str, Sequence[str], None] = 'e8f9a0b1c2d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'profile_jobs',
+        sa.Column('candidate_id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('first_requested_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('run_after', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.ForeignKeyConstraint(['candidate_id'], ['candidates.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('candidate_id'),
+    )
+    op.create_index('ix_profile_jobs_run_after', 'profile_jobs', ['run_after'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_profile_jobs_run_after', table_name='profile_jobs')
+    op.drop_table('profile_jobs')
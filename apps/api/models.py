@@ -1,6 +1,7 @@
 from sqlalchemy import (
     Column, Integer, String, Text, DateTime, ForeignKey, UniqueConstraint, Boolean
 )
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from db import Base
@@ -44,11 +45,13 @@ class Candidate(Base):
     __tablename__ = "candidates"
     id = Column(Integer, primary_key=True)
 
-    event_id = Column(Integer, ForeignKey("events.id", ondelete="CASCADE"), nullable=True)
+    event_id = Column(Integer, ForeignKey("events.id", ondelete="CASCADE"), nullable=True, index=True)
     name = Column(String(120), nullable=False)
     description = Column(Text, nullable=True)
     photo = Column(Text, nullable=True)  # base64 data URL
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    # moves on every edit; event candidate-list ETags are built from it
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
 
     event = relationship("Event", back_populates="candidates")
     submissions = relationship("Submission", back_populates="candidate", cascade="all, delete-orphan")
@@ -76,6 +79,68 @@ class Submission(Base):
     )
 
 
+class SubmissionAnalysis(Base):
+    __tablename__ = "submission_analyses"
+    submission_id = Column(Integer, ForeignKey("submissions.id", ondelete="CASCADE"), primary_key=True)
+
+    # sha256 of vote + comment; a mismatch means the submission was edited
+    content_hash = Column(String(64), nullable=False)
+    analyzer_version = Column(String(32), nullable=False)
+
+    # [[polarity, canonical trait, evidence], ...] before trait grouping
+    traits = Column(JSONB, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+
+class CandidateProfile(Base):
+    __tablename__ = "candidate_profiles"
+    candidate_id = Column(Integer, ForeignKey("candidates.id", ondelete="CASCADE"), primary_key=True)
+
+    yes = Column(Integer, nullable=False, default=0)
+    neutral = Column(Integer, nullable=False, default=0)
+    no = Column(Integer, nullable=False, default=0)
+
+    # {label: count} / {label: [evidence, ...]} after trait grouping
+    pos_counts = Column(JSONB, nullable=False, default=dict)
+    neg_counts = Column(JSONB, nullable=False, default=dict)
+    pos_examples = Column(JSONB, nullable=False, default=dict)
+    neg_examples = Column(JSONB, nullable=False, default=dict)
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+
+class CandidateProfileEntry(Base):
+    # what each submission currently contributes to candidate_profiles,
+    # so an edit/delete can subtract exactly what was added.
+    # no FK to submissions: the entry has to outlive a deleted submission.
+    __tablename__ = "candidate_profile_entries"
+    submission_id = Column(Integer, primary_key=True)
+    candidate_id = Column(Integer, ForeignKey("candidates.id", ondelete="CASCADE"), nullable=False, index=True)
+
+    vote = Column(Integer, nullable=False)
+    content_hash = Column(String(64), nullable=False)
+
+    # [[polarity, grouped label, evidence], ...]
+    traits = Column(JSONB, nullable=False)
+    # False: the vector store was down, labels are canonical traits; the
+    # profile reads as degraded until a profile job regroups them
+    grouped = Column(Boolean, nullable=False, default=True, server_default="true")
+
+
+class ProfileJob(Base):
+    # pending recompute of one candidate's profile (see profile_jobs.py).
+    # one row per candidate, so a burst of votes collapses into one job.
+    __tablename__ = "profile_jobs"
+    candidate_id = Column(Integer, ForeignKey("candidates.id", ondelete="CASCADE"), primary_key=True)
+
+    version = Column(Integer, nullable=False, default=1)   # bumped by every enqueue
+    first_requested_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    run_after = Column(DateTime(timezone=True), nullable=False, index=True)
+
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+
+
 class EventInvite(Base):
     __tablename__ = "event_invites"
     id = Column(Integer, primary_key=True)
@@ -1,18 +1,89 @@
 from __future__ import annotations
 
+import hashlib
+import json
+import os
 import re
-import random
+import threading
+import time
+from functools import lru_cache
 from dataclasses import dataclass
-from typing import List, Tuple, Dict
+from typing import List, Tuple, Dict, Iterable, Optional, Sequence
 
+import numpy as np
 import spacy
+from spacy.tokens import Doc, Span, Token
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
 from embeddings import embed_texts
-from qdrant_utils import search_trait, upsert_trait
-
-# Load once at import (fine for dev + small apps)
-_NLP = spacy.load("en_core_web_sm")
-_VADER = SentimentIntensityAnalyzer()
+from phrase_matcher import PhraseMatcher
+from trait_counts import TraitCounter
+from qdrant_utils import search_trait, search_traits, trait_point_id, upsert_trait, upsert_traits
+from trait_clusters import get_remap
+
+# Bump whenever extraction / canonicalization output changes;
+# cached per-submission analyses from other versions are ignored.
+# (synonyms.json edits are covered by analyzer_version())
+ANALYZER_VERSION = "2"
+
+# What each stage reads from spaCy, and so which components it needs:
+#   analyze:      sentence boundaries + noun_chunks (parser), POS (tagger),
+#                 lemmas (attribute_ruler + lemmatizer), is_stop (lexical)
+#   canonicalize: lemmas + is_stop only, on 1-3 word strings
+# Components no stage needs are excluded at load time; the rest are skipped
+# per call (nlp(..., disable=...) doesn't mutate the shared pipeline).
+# None of them feed each other except via tok2vec, so output is unchanged.
+_STAGE_COMPONENTS = {
+    "analyze": {"tok2vec", "tagger", "parser", "attribute_ruler", "lemmatizer"},
+    "canonicalize": {"tok2vec", "tagger", "attribute_ruler", "lemmatizer"},
+}
+_EXCLUDED_COMPONENTS = ["ner", "senter"]
+
+# SPACY_TRIMMED=0 loads and runs the full pipeline (benchmark baseline)
+SPACY_TRIMMED = os.getenv("SPACY_TRIMMED", "1") == "1"
+
+# Loaded on first use (or by warmup.py in the background) so importing
+# this module stays cheap for CRUD-only code paths
+_NLP = None
+_VADER = None
+_STAGE_DISABLE: Dict[str, List[str]] = {}
+_LOAD_LOCK = threading.Lock()
+
+
+def get_nlp():
+    global _NLP, _STAGE_DISABLE
+    if _NLP is None:
+        with _LOAD_LOCK:
+            if _NLP is None:
+                if SPACY_TRIMMED:
+                    nlp = spacy.load("en_core_web_sm", exclude=_EXCLUDED_COMPONENTS)
+                    _STAGE_DISABLE = {
+                        stage: [name for name in nlp.pipe_names if name not in needed]
+                        for stage, needed in _STAGE_COMPONENTS.items()
+                    }
+                else:
+                    nlp = spacy.load("en_core_web_sm")
+                    _STAGE_DISABLE = {stage: [] for stage in _STAGE_COMPONENTS}
+                _NLP = nlp
+    return _NLP
+
+
+def parse(text: str, stage: str = "analyze") -> Doc:
+    nlp = get_nlp()
+    return nlp(text, disable=_STAGE_DISABLE[stage])
+
+
+def parse_many(texts: Iterable[str], stage: str = "analyze", batch_size: int = 64) -> Iterable[Doc]:
+    nlp = get_nlp()
+    return nlp.pipe(texts, batch_size=batch_size, disable=_STAGE_DISABLE[stage])
+
+
+def get_vader() -> SentimentIntensityAnalyzer:
+    global _VADER
+    if _VADER is None:
+        with _LOAD_LOCK:
+            if _VADER is None:
+                _VADER = SentimentIntensityAnalyzer()
+    return _VADER
 
 # Basic cleanup + normalization helpers
 _punct_re = re.compile(r"[^\w\s-]")
@@ -25,6 +96,55 @@ def normalize_phrase(s: str) -> str:
     return s
 
 
+# VADER compound thresholds for clause polarity
+POLARITY_POS_THRESHOLD = float(os.getenv("POLARITY_POS_THRESHOLD", "0.15"))
+POLARITY_NEG_THRESHOLD = float(os.getenv("POLARITY_NEG_THRESHOLD", "-0.15"))
+POLARITY_CACHE_SIZE = int(os.getenv("POLARITY_CACHE_SIZE", "50000"))
+
+# chunks: scored chunks, distinct: after in-batch dedup, misses: sent to VADER
+_POLARITY_COUNTERS: Dict[str, float] = {"chunks": 0, "distinct": 0, "misses": 0, "seconds": 0.0}
+_POLARITY_LOCK = threading.Lock()
+
+
+@lru_cache(maxsize=POLARITY_CACHE_SIZE)
+def _compound(key: str) -> float:
+    with _POLARITY_LOCK:
+        _POLARITY_COUNTERS["misses"] += 1
+    return get_vader().polarity_scores(key)["compound"]
+
+
+def _polarity_key(chunk: str) -> str:
+    # VADER tokenizes on whitespace and reads case and "!"/"?" itself, so
+    # only whitespace is normalized; anything more would change scores
+    return " ".join(chunk.split())
+
+
+def chunk_polarities(chunks: Sequence[str]) -> List[int]:
+    """
+    Polarity stage: +1 / -1 / 0 per chunk. Chunks are deduped and each
+    distinct one is scored through an LRU cache of VADER compound scores
+    (thresholds are applied after the cache, so they can change freely).
+    """
+    t = time.perf_counter()
+    keys = [_polarity_key(c) for c in chunks]
+    scores = {k: _compound(k) for k in dict.fromkeys(keys)}
+    with _POLARITY_LOCK:
+        _POLARITY_COUNTERS["chunks"] += len(keys)
+        _POLARITY_COUNTERS["distinct"] += len(scores)
+        _POLARITY_COUNTERS["seconds"] += time.perf_counter() - t
+
+    out = []
+    for k in keys:
+        compound = scores[k]
+        if compound >= POLARITY_POS_THRESHOLD:
+            out.append(1)
+        elif compound <= POLARITY_NEG_THRESHOLD:
+            out.append(-1)
+        else:
+            out.append(0)
+    return out
+
+
 def sentence_polarity(sentence: str) -> int:
     #
     #Returns:
@@ -32,84 +152,113 @@ def sentence_polarity(sentence: str) -> int:
     #  -1 for negative
     #  0 for neutral
     #
-    scores = _VADER.polarity_scores(sentence)
-    compound = scores["compound"]
+    return chunk_polarities([sentence])[0]
+
 
-    # thresholds: tweak later
-    if compound >= 0.15:
-        return 1
-    if compound <= -0.15:
-        return -1
-    return 0
+def polarity_counters() -> Dict[str, float]:
+    with _POLARITY_LOCK:
+        return dict(_POLARITY_COUNTERS)
+
+
+def add_polarity_counters(delta: Dict[str, float]):
+    # folds in counters reported back by profile_pool worker processes
+    with _POLARITY_LOCK:
+        for k, v in delta.items():
+            _POLARITY_COUNTERS[k] += v
+
+
+def polarity_stats() -> Dict:
+    c = polarity_counters()
+    hits = c["distinct"] - c["misses"]
+    return {
+        "chunks": int(c["chunks"]),
+        "dedup_rate": round(1 - c["distinct"] / c["chunks"], 4) if c["chunks"] else None,
+        "cache_hit_rate": round(hits / c["distinct"], 4) if c["distinct"] else None,
+        "seconds": round(c["seconds"], 3),
+        "cache_size": _compound.cache_info().currsize,
+        "thresholds": [POLARITY_NEG_THRESHOLD, POLARITY_POS_THRESHOLD],
+    }
+
+
+_contrast_re = re.compile(r"\b(but|however|though|although|sometimes)\b", re.IGNORECASE)
+
+
+def contrast_bounds(text: str) -> List[Tuple[int, int]]:
+    # (start, end) char offsets of each contrast chunk, whitespace-trimmed;
+    # the markers themselves are dropped
+    bounds: List[Tuple[int, int]] = []
+    pos = 0
+    cuts = [(m.start(), m.end()) for m in _contrast_re.finditer(text)]
+    cuts.append((len(text), len(text)))
+    for cut_start, cut_end in cuts:
+        seg = text[pos:cut_start]
+        stripped = seg.strip()
+        if stripped:
+            start = pos + (len(seg) - len(seg.lstrip()))
+            bounds.append((start, start + len(stripped)))
+        pos = cut_end
+    return bounds
 
 
 def split_on_contrast(text: str) -> List[str]:
     # split on common contrast markers
     # keep it simple; we can refine later
-    parts = re.split(r"\b(but|however|though|although|sometimes)\b", text, flags=re.IGNORECASE)
-    # re.split keeps the separators; rebuild into chunks
-    chunks: List[str] = []
-    buf = ""
-    for p in parts:
-        p = p.strip()
-        if not p:
-            continue
-        if p.lower() in {"but", "however", "though", "although", "sometimes"}:
-            # start a new chunk
-            if buf.strip():
-                chunks.append(buf.strip())
-            buf = ""
-        else:
-            if buf:
-                buf += " " + p
-            else:
-                buf = p
-    if buf.strip():
-        chunks.append(buf.strip())
-    return chunks
+    return [text[start:end] for start, end in contrast_bounds(text)]
+
+
+_GENERIC_NOUNS = {"he", "she", "they", "him", "her", "them", "person", "guy", "kid", "student", "people"}
 
 
 def extract_candidate_phrases(sentence: str) -> List[str]:
-    doc = _NLP(sentence)
-    phrases: List[str] = []
+    return [text for text, _ in extract_span_phrases(parse(sentence))]
+
+
+def extract_span_phrases(span: Doc | Span) -> List[Tuple[str, List[Token]]]:
+    """
+    Phrase extraction over already-parsed tokens.
+    Returns (phrase, tokens) pairs; the tokens are what canonicalize_tokens
+    reads instead of re-parsing the phrase string.
+    """
+    phrases: List[Tuple[str, List[Token]]] = []
 
     # noun chunks
-    for chunk in doc.noun_chunks:
+    for chunk in span.noun_chunks:
         text = normalize_phrase(chunk.text)
         if not text:
             continue
-        if text in {"he", "she", "they", "him", "her", "them", "person", "guy", "kid", "student", "people"}:
+        if text in _GENERIC_NOUNS:
             continue
         if len(text.split()) > 5:
             continue
-        phrases.append(text)
-
-    # adjectives
-    for token in doc:
+        phrases.append((text, list(chunk)))
+
+    # adjectives, then slang/descriptive nouns fallback (ex: "chiller"),
+    # collected in one pass over the tokens
+    seen = {p for p, _ in phrases}
+    adjectives: List[Tuple[str, List[Token]]] = []
+    descriptive: List[Tuple[str, List[Token]]] = []
+    for token in span:
         if token.pos_ == "ADJ":
             text = normalize_phrase(token.lemma_)
-            if text and text not in phrases:
-                phrases.append(text)
-
-    # slang/descriptive nouns fallback (ex: "chiller")
-    for token in doc:
-        if token.pos_ in {"NOUN", "PROPN"}:
+            if text and text not in seen:
+                seen.add(text)
+                adjectives.append((text, [token]))
+        elif token.pos_ in {"NOUN", "PROPN"}:
             t = normalize_phrase(token.text)
-            if not t:
-                continue
             if len(t) <= 2:
                 continue
             # heuristic: descriptive "-er" nouns often represent traits (chiller/talker)
-            if t.endswith("er") and t not in phrases:
-                phrases.append(t)
+            if t.endswith("er") and t not in seen:
+                descriptive.append((t, [token]))
+    phrases += adjectives + descriptive
 
     # dedup
     seen = set()
     out = []
-    for p in phrases:
+    for p, tokens in phrases:
         if p not in seen:
             seen.add(p)
-            out.append(p)
+            out.append((p, tokens))
     return out
 
 
@@ -128,7 +277,7 @@ def analyze_comment(comment: str, vote: int) -> List[Tuple[int, str, str]]:
             return [(-1, comment, comment)]
         return []
 
-    doc = _NLP(comment)
+    doc = parse(comment)
     results: List[Tuple[int, str, str]] = []
 
     for sent in doc.sents:
@@ -166,173 +315,100 @@ _STOP_WORDS = {
 # Trait normalization
 # ----------------------------
 
-# Multi-word phrases first (most precise)
-_PHRASE_MAP = {
-    # communication style / respect
-    "talks over people": "interrupts",
-    "talks over others": "interrupts",
-    "talks over": "interrupts",
-    "cuts people off": "interrupts",
-    "cuts others off": "interrupts",
-    "interrupts people": "interrupts",
-    "interrupts others": "interrupts",
-    "doesnt listen": "poor listener",
-    "doesn't listen": "poor listener",
-    "not a good listener": "poor listener",
-    "poor listener": "poor listener",
-    "doesnt listen well": "poor listener",
-    "doesn't listen well": "poor listener",
-
-    "came across disrespectful": "rude",
-    "was disrespectful": "rude",
-    "acted disrespectful": "rude",
-    "rude to people": "rude",
-    "rude to others": "rude",
-    "mean to people": "mean",
-    "mean to others": "mean",
-    "talks down to people": "condescending",
-    "talks down to others": "condescending",
-    "looked down on people": "condescending",
-    "looked down on others": "condescending",
-
-    # teamwork / social
-    "easy to talk to": "approachable",
-    "easy to speak with": "approachable",
-    "easy to communicate with": "approachable",
-    "good to talk to": "approachable",
-
-    "gets along with others": "team player",
-    "works well with others": "team player",
-    "good with others": "team player",
-    "good teammate": "team player",
-    "team player": "team player",
-
-    "good leader": "leadership",
-    "natural leader": "leadership",
-    "shows leadership": "leadership",
-
-    # vibe / energy
-    "laid back": "chill",
-    "easygoing": "chill",
-    "easy going": "chill",
-    "go with the flow": "chill",
-    "lowkey": "chill",
-
-    # reliability
-    "shows up on time": "punctual",
-    "always on time": "punctual",
-    "on time": "punctual",
-
-    "hard working": "hardworking",
-    "works hard": "hardworking",
-    "puts in effort": "hardworking",
-    "high effort": "hardworking",
-
-    "didnt try": "low effort",
-    "didn't try": "low effort",
-    "low effort": "low effort",
-    "seemed lazy": "lazy",
-
-    # social dominance
-    "takes over conversations": "dominates conversation",
-    "dominates conversations": "dominates conversation",
-    "dominates conversation": "dominates conversation",
-
-    # positivity / friendliness
-    "very nice guy": "nice",
-    "nice guy": "nice",
-    "nice person": "nice",
-    "really nice": "nice",
-    "super nice": "nice",
-
-    "very friendly": "friendly",
-    "super friendly": "friendly",
-    "really friendly": "friendly",
-    "friendly guy": "friendly",
-    "friendly person": "friendly",
-
-    # confidence / behavior
-    "too confident": "arrogant",
-    "overconfident": "arrogant",
-    "full of himself": "arrogant",
-    "full of herself": "arrogant",
-    "acts better than others": "arrogant",
-
-    # maturity
-    "immature behavior": "immature",
-    "acts immature": "immature",
-    "seemed immature": "immature",
-
-    # boring / indifferent
-    "kind of boring": "boring",
-    "pretty boring": "boring",
-    "seemed boring": "boring",
-}
+# synonyms.json: {"phrases": {...}, "words": {...}}
+#   phrases: multi-word phrases first (most precise)
+#   words:   single-word mapping (less precise, so keep conservative)
+# Edits to the file are picked up within SYNONYMS_CHECK_SECONDS, no restart.
+SYNONYMS_PATH = os.getenv("SYNONYMS_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "synonyms.json"))
+SYNONYMS_CHECK_SECONDS = float(os.getenv("SYNONYMS_CHECK_SECONDS", "5"))
+
+_SYNONYMS: Optional[Tuple[PhraseMatcher, Dict[str, str], str]] = None
+_SYNONYMS_SIG: Optional[Tuple[int, int]] = None
+_SYNONYMS_CHECKED = 0.0
+_SYNONYMS_LOCK = threading.Lock()
+
+
+def load_synonyms(path: str = SYNONYMS_PATH) -> Tuple[PhraseMatcher, Dict[str, str], str]:
+    # -> (compiled phrase matcher, word map, content digest)
+    with open(path, "rb") as f:
+        raw = f.read()
+    data = json.loads(raw)
+    phrases = {normalize_phrase(k): v for k, v in data["phrases"].items()}
+    words = {normalize_phrase(k): v for k, v in data["words"].items()}
+    return PhraseMatcher(phrases), words, hashlib.sha256(raw).hexdigest()[:12]
+
+
+def reload_synonyms(force: bool = False) -> bool:
+    """
+    Recompiles the tables if synonyms.json changed on disk (or `force`).
+    Returns True when new tables were swapped in. A broken edit is logged
+    and the previous tables stay active.
+    """
+    global _SYNONYMS, _SYNONYMS_SIG, _SYNONYMS_CHECKED
+    with _SYNONYMS_LOCK:
+        _SYNONYMS_CHECKED = time.monotonic()
+        st = os.stat(SYNONYMS_PATH)
+        sig = (st.st_mtime_ns, st.st_size)
+        if not force and _SYNONYMS is not None and sig == _SYNONYMS_SIG:
+            return False
+        try:
+            tables = load_synonyms(SYNONYMS_PATH)
+        except Exception as e:
+            if _SYNONYMS is None:
+                raise
+            print(f"[nlp] keeping previous synonyms, {SYNONYMS_PATH} failed to load: {e!r}")
+            _SYNONYMS_SIG = sig
+            return False
+        if _SYNONYMS is not None:
+            print(f"[nlp] synonyms reloaded: {len(tables[0])} phrases, {len(tables[1])} words ({tables[2]})")
+        _SYNONYMS, _SYNONYMS_SIG = tables, sig
+        return True
+
+
+def get_synonyms() -> Tuple[PhraseMatcher, Dict[str, str], str]:
+    if _SYNONYMS is None or time.monotonic() - _SYNONYMS_CHECKED >= SYNONYMS_CHECK_SECONDS:
+        try:
+            reload_synonyms()
+        except OSError as e:
+            if _SYNONYMS is None:
+                raise
+            print(f"[nlp] synonyms check failed: {e!r}")
+    return _SYNONYMS
+
+
+def analyzer_version() -> str:
+    # cached analyses are only valid for the code *and* the synonym tables that made them
+    return f"{ANALYZER_VERSION}.{get_synonyms()[2]}"
+
+
+def phrase_hits(text: str) -> List[str]:
+    """
+    Canonical labels of every multi-word synonym phrase inside `text`
+    ("he talks over people a lot" -> ["interrupts"]), one pass over the words.
+    Single-word keys are left to POS-based extraction; matched anywhere they
+    merge too eagerly ("kind", "mean").
+    """
+    phrases, _, _ = get_synonyms()
+    return [label for _, _, label in phrases.find_longest(normalize_phrase(text).split(), min_words=2)]
 
-# Single-word mapping (less precise, so keep conservative)
-_WORD_MAP = {
-    # positives
-    "friendly": "friendly",
-    "nice": "nice",
-    "kind": "nice",
-    "sweet": "nice",
-    "polite": "polite",
-    "respectful": "respectful",
-    "funny": "funny",
-    "hilarious": "funny",
-    "humorous": "funny",
-    "outgoing": "outgoing",
-    "social": "outgoing",
-    "confident": "confident",
-    "approachable": "approachable",
-    "chill": "chill",
-    "chiller": "chill",
-    "easygoing": "chill",
-    "laidback": "chill",
-    "hardworking": "hardworking",
-    "reliable": "reliable",
-    "punctual": "punctual",
-    "helpful": "helpful",
-    "supportive": "supportive",
-    "motivated": "motivated",
-    "driven": "motivated",
-    "smart": "smart",
-    "intelligent": "smart",
-    "curious": "curious",
-
-    # negatives
-    "rude": "rude",
-    "disrespectful": "rude",
-    "mean": "mean",
-    "annoying": "annoying",
-    "arrogant": "arrogant",
-    "condescending": "condescending",
-    "dismissive": "dismissive",
-    "lazy": "lazy",
-    "boring": "boring",
-    "immature": "immature",
-    "awkward": "awkward",
-    "quiet": "quiet",  # neutral-ish trait; keep but use with caution
-    "shy": "shy",
-    "aggressive": "aggressive",
-    "argumentative": "argumentative",
-    "unreliable": "unreliable",
-    "inconsistent": "unreliable",
-    "late": "unpunctual",
-    "unpunctual": "unpunctual",
-    "interrupts": "interrupts",
-}
 
 def apply_synonyms(trait: str) -> str:
     t = normalize_phrase(trait)
+    phrases, words, _ = get_synonyms()
 
     # phrase map first
-    if t in _PHRASE_MAP:
-        return _PHRASE_MAP[t]
+    label = phrases.get(t)
+    if label is not None:
+        return label
 
     # then single word map (only if it's exactly one word)
-    if " " not in t and t in _WORD_MAP:
-        return _WORD_MAP[t]
+    if " " not in t and t in words:
+        return words[t]
+
+    # then the longest known multi-word phrase inside a longer trait
+    hits = phrases.find_longest(t.split(), min_words=2)
+    if hits:
+        return max(hits, key=lambda h: h[1] - h[0])[2]
 
     return t
 
@@ -342,55 +418,298 @@ def canonicalize(trait: str) -> str:
     Normalizes traits (e.g., 'very nice guy' -> 'nice'),
     then applies a controlled synonym map (e.g., 'friendly' -> 'nice').
     """
-    doc = _NLP(trait)
-    tokens = []
-    for t in doc:
+    return canonicalize_tokens(parse(trait, "canonicalize"), trait)
+
+
+def canonicalize_tokens(tokens: Iterable[Token], trait: str) -> str:
+    """
+    canonicalize() for tokens that were already parsed as part of a comment.
+    """
+    kept = []
+    for t in tokens:
         if t.is_stop:
             continue
         lemma = normalize_phrase(t.lemma_)
         if not lemma or lemma in _STOP_WORDS:
             continue
-        tokens.append(lemma)
+        kept.append(lemma)
 
-    if len(tokens) == 0:
+    if len(kept) == 0:
         cleaned = normalize_phrase(trait)
-    elif len(tokens) == 1:
-        cleaned = tokens[0]
+    elif len(kept) == 1:
+        cleaned = kept[0]
     else:
-        cleaned = " ".join(tokens[:3])  # cap length
+        cleaned = " ".join(kept[:3])  # cap length
 
     # Apply synonym map (controlled merges)
     return apply_synonyms(cleaned)
 
 
-_NEXT_ID = random.randint(100000, 999999)
-
-
 def group_trait(trait: str, threshold: float = 0.75) -> str:
-    global _NEXT_ID
+    # labels the offline re-clustering knows about skip the vector search
+    remap = get_remap()
+    if trait in remap:
+        return remap[trait]
 
     vec = embed_texts([trait])[0]
     hits = search_trait(vec, limit=1)
 
-    if hits and hits[0].score is not None and hits[0].score >= threshold:
-        payload = hits[0].payload or {}
-        label = payload.get("label")
+    if hits and hits[0][1] is not None and hits[0][1] >= threshold:
+        _, score, label = hits[0]
 
-        print(f"[group_trait] '{trait}' -> '{label}' score={hits[0].score:.3f}")
+        print(f"[group_trait] '{trait}' -> '{label}' score={score:.3f}")
         if isinstance(label, str) and label:
-            return label
+            return remap.get(label, label)
 
-    # new trait cluster
-    point_id = _NEXT_ID
-    _NEXT_ID += 1
+    # new trait cluster; the id comes from the label, so any worker creating
+    # the same cluster writes the same point
+    point_id = trait_point_id(trait)
     upsert_trait(point_id, vec, trait)
     print(f"[group_trait] NEW CLUSTER '{trait}' id={point_id}")
     return trait
 
 
-def build_profile(submissions: List[Tuple[int, str]], top_k: int = 8) -> Dict:
+def group_traits(traits: Sequence[str], threshold: float = 0.75) -> List[str]:
+    """
+    Batched group_trait: one embed call and one vector query over the
+    distinct traits not in the re-clustering remap, one upsert for the new
+    clusters.
+    Returns the cluster label for every entry of `traits`. Entries are
+    processed in order and each one also sees the clusters created earlier
+    in the same batch, so the result matches calling group_trait on them
+    one by one.
+    """
+    remap = get_remap()
+    distinct = [t for t in dict.fromkeys(traits) if t not in remap]
+    if not distinct:
+        return [remap[t] for t in traits]
+
+    vecs = dict(zip(distinct, embed_texts(distinct)))
+    hits = dict(zip(distinct, search_traits([vecs[t] for t in distinct], limit=1)))
+
+    labels: List[str] = []
+    new_points: List[Tuple[str, List[float], str]] = []
+    new_matrix = np.empty((0, len(vecs[distinct[0]])), dtype=np.float32)
+
+    for trait in traits:
+        if trait in remap:
+            labels.append(remap[trait])
+            continue
+        vec = vecs[trait]
+        label, score = None, None
+        trait_hits = hits[trait]
+        if trait_hits and trait_hits[0][1] is not None:
+            _, score, label = trait_hits[0]
+            label = remap.get(label, label)
+
+        # clusters created earlier in this batch aren't in the collection yet
+        if len(new_matrix):
+            sims = new_matrix @ np.asarray(vec, dtype=np.float32)
+            j = int(np.argmax(sims))
+            if score is None or sims[j] > score:
+                label, score = new_points[j][2], float(sims[j])
+
+        if score is not None and score >= threshold and isinstance(label, str) and label:
+            labels.append(label)
+            continue
+
+        # new trait cluster
+        new_points.append((trait_point_id(trait), vec, trait))
+        new_matrix = np.vstack([new_matrix, np.asarray(vec, dtype=np.float32)])
+        labels.append(trait)
+
+    upsert_traits(new_points)
+    for point_id, _, trait in new_points:
+        print(f"[group_traits] NEW CLUSTER '{trait}' id={point_id}")
+    return labels
+
+
+def check_grouping(pairs: Sequence[Tuple[str, str]], threshold: float = 0.75, limit: int = 5) -> List[Tuple[str, str]]:
+    """
+    Read-only counterpart of group_traits for consistency checks: returns the
+    (trait, label) pairs where `label` can't have come out of grouping
+    `trait`, i.e. it's not the trait itself (a cluster it created), not its
+    remap and not one of its `limit` nearest clusters at >= threshold.
+    Only searches; never creates clusters.
+    """
+    remap = get_remap()
+    todo = [(t, label) for t, label in dict.fromkeys(pairs) if label != t and remap.get(t) != label]
+    if not todo:
+        return []
+    traits = list(dict.fromkeys(t for t, _ in todo))
+    hits = dict(zip(traits, search_traits(embed_texts(traits), limit=limit)))
+    bad: List[Tuple[str, str]] = []
+    for t, label in todo:
+        near = {
+            remap.get(hit, hit)
+            for _, score, hit in hits[t]
+            if score is not None and score >= threshold
+        }
+        if label not in near:
+            bad.append((t, label))
+    return bad
+
+
+# ----------------------------
+# Single-parse pipeline
+# ----------------------------
+
+_PIPE_BATCH_SIZE = 64
+
+
+def contrast_chunks(doc: Doc) -> List[Tuple[str, int, int]]:
+    # (chunk text, start_char, end_char) of every contrast chunk, sentence by sentence
+    chunks: List[Tuple[str, int, int]] = []
+    for sent in doc.sents:
+        s = sent.text.strip()
+        if not s:
+            continue
+        base = sent.start_char + (len(sent.text) - len(sent.text.lstrip()))
+        for start, end in contrast_bounds(s):
+            chunks.append((s[start:end], base + start, base + end))
+    return chunks
+
+
+def _is_short(comment: str) -> bool:
+    # same short-comment shortcut as analyze_comment
+    return len(comment.split()) <= 3
+
+
+def analyze_doc(doc: Doc, vote: int, polarities: Optional[Sequence[int]] = None) -> List[Tuple[int, str, str]]:
+    """
+    analyze_comment + canonicalize over one parsed comment.
+    `polarities` are the chunk_polarities of contrast_chunks(doc), when the
+    caller already scored them in a batch.
+    Returns (polarity, canonical trait, evidence) tuples, before grouping.
+    """
+    comment = doc.text
+    if not comment:
+        return []
+
+    if _is_short(comment):
+        if vote in (1, -1):
+            return [(vote, canonicalize_tokens(doc, comment), comment)]
+        return []
+
+    chunks = contrast_chunks(doc)
+    if polarities is None:
+        polarities = chunk_polarities([chunk for chunk, _, _ in chunks])
+
+    results: List[Tuple[int, str, str]] = []
+
+    for (chunk, start, end), pol in zip(chunks, polarities):
+        # if user voted -1 and sentiment is neutral, treat as negative
+        if pol == 0 and vote == -1:
+            pol = -1
+
+        if pol == 0:
+            continue
+
+        span = doc.char_span(start, end, alignment_mode="expand")
+        if span is None:
+            continue
+
+        labels = []
+        for ph, tokens in extract_span_phrases(span):
+            if len(ph) <= 2:
+                continue
+            labels.append(canonicalize_tokens(tokens, ph))
+
+        # known phrases however spaCy chunked them ("talks over people")
+        labels += [label for label in phrase_hits(chunk) if label not in labels]
+        results.extend((pol, label, chunk) for label in labels)
+
+    return results
+
+
+def analyze_submissions(
+    submissions: Sequence[Tuple[int, str]],
+    batch_size: int = _PIPE_BATCH_SIZE,
+) -> List[List[Tuple[int, str, str]]]:
+    """
+    submissions: list of (vote, comment)
+    Parses every analyzable comment once, in batches through nlp.pipe, and
+    scores the contrast chunks of each batch in one chunk_polarities call.
+    Returns one list of (polarity, canonical trait, evidence) per submission
+    (empty for neutral / empty comments).
+    """
+    out: List[List[Tuple[int, str, str]]] = [[] for _ in submissions]
+
+    todo = [
+        (i, vote, comment.strip())
+        for i, (vote, comment) in enumerate(submissions)
+        if vote != 0 and comment.strip()
+    ]
+    docs = iter(parse_many((comment for _, _, comment in todo), batch_size=batch_size))
+    for b in range(0, len(todo), batch_size):
+        batch = list(zip(todo[b:b + batch_size], docs))
+        chunked = [[] if _is_short(doc.text) else contrast_chunks(doc) for _, doc in batch]
+        pols = iter(chunk_polarities([chunk for chunks in chunked for chunk, _, _ in chunks]))
+        for ((i, vote, _), doc), chunks in zip(batch, chunked):
+            out[i] = analyze_doc(doc, vote, [next(pols) for _ in chunks])
+    return out
+
+
+def group_analyses(analyses: Iterable[List[Tuple[int, str, str]]]) -> List[List[Tuple[int, str, str]]]:
+    """
+    Maps every canonical trait onto its trait cluster label, grouping all
+    distinct traits in one batch.
+    Traits are left as-is when grouping is unavailable.
+    """
+    return try_group_analyses(analyses)[0]
+
+
+def try_group_analyses(analyses: Iterable[List[Tuple[int, str, str]]]) -> Tuple[List[List[Tuple[int, str, str]]], bool]:
+    """
+    group_analyses, plus whether grouping actually ran (False = the vector
+    store was unavailable and the canonical traits came back unchanged).
+    """
+    analyses = [list(results) for results in analyses]
+
+    traits = [trait for results in analyses for _, trait, _ in results]
+
+    # If you're also doing Qdrant grouping, keep this:
+    grouped = True
+    try:
+        labels = iter(group_traits(traits))
+    except Exception as e:
+        print(f"[nlp] trait grouping unavailable, keeping canonical traits: {e!r}")
+        labels = iter(traits)
+        grouped = False
+
+    return [
+        [(pol, next(labels), evidence) for pol, _, evidence in results]
+        for results in analyses
+    ], grouped
+
+
+def aggregate_profile(analyses: Iterable[List[Tuple[int, str, str]]], top_k: Optional[int] = 8) -> Dict:
+    """
+    analyses: per-submission (polarity, canonical trait, evidence) lists
+    Groups traits and ranks them into the profile payload.
+    """
+    counter = TraitCounter()
+    for results in group_analyses(analyses):
+        counter.add_many(results)
+
+    return {
+        "positives": counter.top(True, top_k),
+        "negatives": counter.top(False, top_k),
+    }
+
+
+def build_profile(submissions: List[Tuple[int, str]], top_k: Optional[int] = 8) -> Dict:
+    """
+    submissions: list of (vote, comment)
+    """
+    return aggregate_profile(analyze_submissions(submissions), top_k=top_k)
+
+
+def build_profile_legacy(submissions: List[Tuple[int, str]], top_k: int = 8) -> Dict:
     """
     submissions: list of (vote, comment)
+    Original string-at-a-time path (re-parses every chunk and phrase).
+    Kept so build_profile output can be compared against it.
     """
     pos_counts: Dict[str, int] = {}
     neg_counts: Dict[str, int] = {}
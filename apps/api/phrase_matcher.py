@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+class PhraseMatcher:
+    """
+    Word-level Aho-Corasick automaton over a {phrase: label} table.
+    Phrases and inputs are sequences of already-normalized words; find()
+    reports every phrase occurring in the input in one left-to-right pass,
+    however many phrases the table holds.
+    """
+
+    def __init__(self, table: Dict[str, str]):
+        self._exact: Dict[str, str] = {}
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # (n_words, label) of every phrase ending in this state, own match first
+        self._out: List[List[Tuple[int, str]]] = [[]]
+
+        for phrase, label in table.items():
+            words = phrase.split()
+            if not words:
+                continue
+            self._exact[" ".join(words)] = label
+            state = 0
+            for w in words:
+                nxt = self._goto[state].get(w)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][w] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = nxt
+            self._out[state] = [(len(words), label)]
+
+        # failure links, breadth-first so shallower states are done first
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for w, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and w not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(w, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def __len__(self) -> int:
+        return len(self._exact)
+
+    def __contains__(self, phrase: str) -> bool:
+        return phrase in self._exact
+
+    def get(self, phrase: str) -> Optional[str]:
+        # exact whole-phrase lookup
+        return self._exact.get(phrase)
+
+    def phrases(self) -> Iterable[Tuple[str, str]]:
+        return self._exact.items()
+
+    def find(self, words: Sequence[str], min_words: int = 1) -> List[Tuple[int, int, str]]:
+        """
+        Every (start, end, label) match, end-exclusive word offsets,
+        including overlapping and nested ones.
+        """
+        hits: List[Tuple[int, int, str]] = []
+        state = 0
+        for i, w in enumerate(words):
+            while state and w not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(w, 0)
+            for n, label in self._out[state]:
+                if n >= min_words:
+                    hits.append((i + 1 - n, i + 1, label))
+        return hits
+
+    def find_longest(self, words: Sequence[str], min_words: int = 1) -> List[Tuple[int, int, str]]:
+        """
+        Non-overlapping matches, leftmost first and longest at each start
+        ("talks over people" wins over "talks over").
+        """
+        hits = sorted(self.find(words, min_words), key=lambda h: (h[0], h[0] - h[1]))
+        out: List[Tuple[int, int, str]] = []
+        end = 0
+        for start, stop, label in hits:
+            if start >= end:
+                out.append((start, stop, label))
+                end = stop
+        return out
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import os
+import threading
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+from db import SessionLocal
+from models import ProfileJob
+import live
+import profiles
+
+# Postgres-backed profile recompute queue (no broker). Writes enqueue the
+# candidate; workers claim due jobs with FOR UPDATE SKIP LOCKED, reconcile the
+# materialized profile, and delete the job. One row per candidate: every edit
+# within PROFILE_COALESCE_SECONDS of the first one collapses into one run.
+PROFILE_COALESCE_SECONDS = float(os.getenv("PROFILE_COALESCE_SECONDS", "2"))
+# in-process worker threads started by main; 0 = run scripts/profile_worker.py instead
+PROFILE_QUEUE_WORKERS = int(os.getenv("PROFILE_QUEUE_WORKERS", "1"))
+PROFILE_QUEUE_BATCH = int(os.getenv("PROFILE_QUEUE_BATCH", "8"))
+PROFILE_QUEUE_POLL_SECONDS = float(os.getenv("PROFILE_QUEUE_POLL_SECONDS", "0.5"))
+# a claimed job is invisible to other workers this long; if its worker dies it runs again
+_LEASE = timedelta(seconds=float(os.getenv("PROFILE_JOB_LEASE_SECONDS", "120")))
+_MAX_BACKOFF_SECONDS = 300
+
+_counters: Dict[str, int] = {
+    "enqueued": 0, "coalesced": 0, "processed": 0, "requeued": 0, "failed": 0, "degraded": 0,
+}
+_counter_lock = threading.Lock()
+_stop = threading.Event()
+_threads: List[threading.Thread] = []
+
+
+def _count(key: str, n: int = 1):
+    with _counter_lock:
+        _counters[key] += n
+
+
+def enqueue(db: Session, candidate_id: int):
+    """
+    Marks the candidate's profile for recompute. Doesn't commit: call it in the
+    same transaction as the submission write, so the job and the vote land
+    together.
+    """
+    stmt = insert(ProfileJob).values(
+        candidate_id=candidate_id,
+        version=1,
+        run_after=func.now() + timedelta(seconds=PROFILE_COALESCE_SECONDS),
+        attempts=0,
+    )
+    # an existing job keeps its run_after and first_requested_at: that's the coalescing
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ProfileJob.candidate_id],
+        set_={"version": ProfileJob.version + 1},
+    ).returning(ProfileJob.version)
+    version = db.execute(stmt).scalar()
+    _count("enqueued")
+    if version and version > 1:
+        _count("coalesced")
+
+
+def _claim(db: Session, limit: int):
+    rows = db.execute(
+        select(ProfileJob.candidate_id, ProfileJob.version, ProfileJob.attempts)
+        .where(ProfileJob.run_after <= func.now())
+        .order_by(ProfileJob.run_after)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if rows:
+        db.execute(
+            update(ProfileJob)
+            .where(ProfileJob.candidate_id.in_([r.candidate_id for r in rows]))
+            .values(run_after=func.now() + _LEASE, attempts=ProfileJob.attempts + 1)
+        )
+    claimed_at = db.execute(select(func.now())).scalar()
+    db.commit()
+    return rows, claimed_at
+
+
+def _finish(db: Session, candidate_id: int, version: int, claimed_at):
+    done = db.execute(
+        delete(ProfileJob).where(ProfileJob.candidate_id == candidate_id, ProfileJob.version == version)
+    )
+    if done.rowcount == 0:
+        # edited while we were working: run again now; those edits are at most claimed_at old
+        db.execute(
+            update(ProfileJob)
+            .where(ProfileJob.candidate_id == candidate_id)
+            .values(run_after=func.now(), first_requested_at=claimed_at, attempts=0, last_error=None)
+        )
+        _count("requeued")
+    db.commit()
+
+
+def _retry_later(db: Session, candidate_id: int, attempts: int, reason: str):
+    backoff = min(PROFILE_COALESCE_SECONDS * 2 ** attempts, _MAX_BACKOFF_SECONDS)
+    db.execute(
+        update(ProfileJob)
+        .where(ProfileJob.candidate_id == candidate_id)
+        .values(run_after=func.now() + timedelta(seconds=backoff), last_error=reason[:1000])
+    )
+    db.commit()
+
+
+def _fail(db: Session, candidate_id: int, attempts: int, error: Exception):
+    db.rollback()
+    _retry_later(db, candidate_id, attempts, repr(error))
+    _count("failed")
+
+
+def run_once(db: Session, limit: int = PROFILE_QUEUE_BATCH) -> int:
+    """
+    Claims up to `limit` due jobs and reconciles each candidate's profile.
+    Returns the number of jobs claimed (0 = queue idle).
+    """
+    rows, claimed_at = _claim(db, limit)
+    for candidate_id, version, attempts in rows:
+        try:
+            changed = profiles.reconcile_candidate(db, candidate_id)
+        except Exception as e:
+            print(f"[profile_jobs] candidate {candidate_id} failed (attempt {attempts + 1}): {e!r}")
+            _fail(db, candidate_id, attempts, e)
+            continue
+        if candidate_id in profiles.ungrouped_candidates(db, [candidate_id]):
+            # stored, but with the vector store down; keep the job to regroup later
+            _retry_later(db, candidate_id, attempts, "trait grouping unavailable")
+            _count("degraded")
+            continue
+        _finish(db, candidate_id, version, claimed_at)
+        _count("processed")
+        if changed:
+            live.publish_profile(db, candidate_id)
+    return len(rows)
+
+
+def _work(stop: threading.Event):
+    while not stop.is_set():
+        try:
+            with SessionLocal() as db:
+                claimed = run_once(db)
+        except Exception as e:
+            print(f"[profile_jobs] worker error: {e!r}")
+            claimed = 0
+        if not claimed:
+            stop.wait(PROFILE_QUEUE_POLL_SECONDS)
+
+
+def start_workers(n: int = PROFILE_QUEUE_WORKERS):
+    _stop.clear()
+    for i in range(n - len(_threads)):
+        t = threading.Thread(target=_work, args=(_stop,), name=f"profile-jobs-{i}", daemon=True)
+        t.start()
+        _threads.append(t)
+
+
+def stop_workers(timeout: Optional[float] = 5):
+    _stop.set()
+    for t in _threads:
+        t.join(timeout)
+    _threads.clear()
+
+
+def stats() -> Dict:
+    with _counter_lock:
+        out = dict(_counters)
+    out["workers"] = len(_threads)
+    out["coalesce_seconds"] = PROFILE_COALESCE_SECONDS
+    return out
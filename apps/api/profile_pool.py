@@ -0,0 +1,291 @@
+from __future__ import annotations
+
+import multiprocessing as mp
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import nlp
+import qdrant_utils
+import vector_store
+
+# CPU-bound NLP (spaCy/VADER/embeddings) runs here instead of on Starlette's
+# request threadpool, so big profile builds can't starve cheap endpoints.
+# PROFILE_POOL_SIZE=0 runs everything inline in the calling thread.
+PROFILE_POOL_SIZE = int(os.getenv("PROFILE_POOL_SIZE", str(max((os.cpu_count() or 2) // 2, 1))))
+# tasks queued + running before new ones are rejected with PoolBusy
+PROFILE_POOL_QUEUE = int(os.getenv("PROFILE_POOL_QUEUE", str(PROFILE_POOL_SIZE * 4)))
+PROFILE_TASK_TIMEOUT = float(os.getenv("PROFILE_TASK_TIMEOUT", "30"))
+# submissions one task is expected to get through in PROFILE_TASK_TIMEOUT;
+# bigger tasks (cold event-wide builds) get a proportionally longer deadline
+PROFILE_TASK_SUBMISSIONS = int(os.getenv("PROFILE_TASK_SUBMISSIONS", "2000"))
+# a single-process vector store (qdrant-local, pathless numpy) can't be opened
+# from the workers, so trait grouping stays in this process and only comment
+# analysis goes to the pool
+GROUP_INLINE = vector_store.single_process_backend()
+# below this many submissions per worker, splitting costs more than it saves
+_MIN_SPLIT = 256
+
+
+class PoolBusy(RuntimeError):
+    pass
+
+
+class TaskTimeout(RuntimeError):
+    pass
+
+
+class PoolBroken(RuntimeError):
+    # a worker died (OOM kill, segfault); the pool is being restarted
+    pass
+
+
+_executor: Optional[ProcessPoolExecutor] = None
+_workers_ready = None  # shared counter of the current executor's initialized workers
+_slots = threading.BoundedSemaphore(max(PROFILE_POOL_QUEUE, 1))
+_lock = threading.Lock()
+_count_lock = threading.Lock()  # separate: cancel callbacks fire inside shutdown()
+_in_flight = 0
+
+
+def _init_worker(ready=None):
+    # each worker loads the models once, up front, and counts itself ready
+    # when every required one loaded
+    import warmup
+
+    ok = True
+    for name, loader, required in warmup.components(analysis=True, grouping=not GROUP_INLINE):
+        try:
+            loader()
+        except Exception as e:
+            print(f"[profile_pool] worker {os.getpid()}: {name} failed to load: {e!r}")
+            ok = ok and not required
+    if ok and ready is not None:
+        with ready.get_lock():
+            ready.value += 1
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def _counters() -> Dict[str, Dict[str, float]]:
+    # the worker's running totals of the counters /metrics reports
+    out = {"polarity": nlp.polarity_counters()}
+    if qdrant_utils._store is not None:
+        out["vector_store"] = qdrant_utils._store.counters()
+    return out
+
+
+def _call(fn: Callable, args: tuple):
+    # runs in the worker; ships counter deltas back with the result
+    before = _counters()
+    try:
+        result = fn(*args)
+    finally:
+        # a finished task's new clusters are visible to other workers
+        qdrant_utils.flush()
+    deltas = {}
+    for name, now in _counters().items():
+        old = before.get(name, {})
+        deltas[name] = {k: v - old.get(k, 0) for k, v in now.items()}
+    return result, deltas
+
+
+def _merge_counters(deltas: Dict[str, Dict[str, float]]):
+    nlp.add_polarity_counters(deltas.get("polarity", {}))
+    if deltas.get("vector_store"):
+        qdrant_utils.add_pool_counters(deltas["vector_store"])
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor, _workers_ready
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                # spawn: forking a process that already runs threads (uvicorn, torch) isn't safe
+                ctx = mp.get_context("spawn")
+                _workers_ready = ctx.Value("i", 0)
+                _executor = ProcessPoolExecutor(
+                    max_workers=PROFILE_POOL_SIZE,
+                    mp_context=ctx,
+                    initializer=_init_worker,
+                    initargs=(_workers_ready,),
+                )
+    return _executor
+
+
+def in_process() -> Tuple[bool, bool]:
+    # (analysis, grouping): the NLP stages that run in this process rather
+    # than in the workers, i.e. the models the API process itself has to load
+    inline = PROFILE_POOL_SIZE <= 0
+    return inline, inline or GROUP_INLINE
+
+
+def workers_ready() -> int:
+    counter = _workers_ready
+    return counter.value if counter is not None else 0
+
+
+def is_ready() -> bool:
+    # every worker of the current pool finished loading its models
+    return PROFILE_POOL_SIZE <= 0 or workers_ready() >= PROFILE_POOL_SIZE
+
+
+def _restart(broken: ProcessPoolExecutor):
+    # a dead worker breaks the whole executor for good: drop it (once, however
+    # many callers saw it break) and bring up a fresh one
+    global _executor
+    with _lock:
+        if _executor is not broken:
+            return
+        _executor = None
+    broken.shutdown(wait=False, cancel_futures=True)
+    print("[profile_pool] a worker died; restarting the pool")
+    start()
+
+
+def start():
+    """
+    Starts every worker now (they preload models) instead of on first use.
+    """
+    if PROFILE_POOL_SIZE <= 0:
+        return
+    ex = _get_executor()
+    for _ in range(PROFILE_POOL_SIZE):
+        ex.submit(_ping)
+
+
+def shutdown():
+    global _executor
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def _track(delta: int):
+    global _in_flight
+    with _count_lock:
+        _in_flight += delta
+
+
+def _release(*_):
+    _track(-1)
+    _slots.release()
+
+
+def run(fn: Callable, *args, timeout: Optional[float] = None):
+    """
+    Runs fn(*args) in the pool and waits for the result.
+    Raises PoolBusy when PROFILE_POOL_QUEUE tasks are already in flight,
+    TaskTimeout after `timeout` (default PROFILE_TASK_TIMEOUT) seconds and
+    PoolBroken when a worker died (the pool is replaced for later calls).
+    A task that already started keeps its slot until it actually finishes.
+    """
+    return run_many(fn, [args], timeout=timeout)[0]
+
+
+def run_many(fn: Callable, arg_lists: Sequence[tuple], timeout: Optional[float] = None) -> List:
+    """
+    run() for several argument tuples at once, spread over the workers.
+    Takes a slot per task up front (all or none) and applies one deadline
+    to the whole set. Results come back in argument order.
+    """
+    if PROFILE_POOL_SIZE <= 0:
+        return [fn(*args) for args in arg_lists]
+
+    taken = 0
+    while taken < len(arg_lists) and _slots.acquire(blocking=False):
+        taken += 1
+    if taken < len(arg_lists):
+        for _ in range(taken):
+            _slots.release()
+        raise PoolBusy(f"profile pool full ({PROFILE_POOL_QUEUE} tasks in flight)")
+
+    executor = _get_executor()
+    futures = []
+    for i, args in enumerate(arg_lists):
+        _track(+1)
+        try:
+            fut = executor.submit(_call, fn, args)
+        except Exception as e:
+            _release()
+            for _ in range(len(arg_lists) - i - 1):
+                _slots.release()
+            for f in futures:
+                f.cancel()
+            if isinstance(e, BrokenProcessPool):
+                _restart(executor)
+                raise PoolBroken("profile workers restarting") from e
+            raise
+        fut.add_done_callback(_release)
+        futures.append(fut)
+
+    limit = PROFILE_TASK_TIMEOUT if timeout is None else timeout
+    deadline = time.monotonic() + limit
+    results = []
+    try:
+        for fut in futures:
+            result, counters = fut.result(timeout=max(deadline - time.monotonic(), 0))
+            _merge_counters(counters)
+            results.append(result)
+    except FutureTimeout:
+        # only cancels the ones still queued; running tasks finish in their worker
+        for fut in futures:
+            fut.cancel()
+        raise TaskTimeout(f"{fn.__name__} exceeded {limit}s")
+    except BrokenProcessPool as e:
+        for fut in futures:
+            fut.cancel()
+        _restart(executor)
+        raise PoolBroken("profile workers restarting") from e
+    return results
+
+
+# -------------------------
+# pool-backed NLP entry points (same signatures as nlp.*)
+# -------------------------
+
+def analyze_submissions(submissions: Sequence[Tuple[int, str]]) -> List[List[Tuple[int, str, str]]]:
+    # large batches (event-wide rebuilds) are split across the workers
+    if not submissions:
+        return []
+    submissions = list(submissions)
+    parts = max(min(PROFILE_POOL_SIZE, len(submissions) // _MIN_SPLIT), 1)
+    size = -(-len(submissions) // parts)
+    results = run_many(
+        nlp.analyze_submissions,
+        [(submissions[i:i + size],) for i in range(0, len(submissions), size)],
+        timeout=_deadline(size),  # the parts run side by side
+    )
+    return [analysis for part in results for analysis in part]
+
+
+def group_analyses(analyses: Sequence[List[Tuple[int, str, str]]]) -> Tuple[List[List[Tuple[int, str, str]]], bool]:
+    # (grouped analyses, whether grouping ran); see nlp.try_group_analyses
+    analyses = [list(results) for results in analyses]
+    if not any(analyses):
+        return analyses, True
+    if GROUP_INLINE:
+        return nlp.try_group_analyses(analyses)
+    return run(nlp.try_group_analyses, analyses, timeout=_deadline(len(analyses)))
+
+
+def _deadline(submissions: int) -> float:
+    return PROFILE_TASK_TIMEOUT * max(1.0, submissions / max(PROFILE_TASK_SUBMISSIONS, 1))
+
+
+def stats() -> dict:
+    return {
+        "size": PROFILE_POOL_SIZE,
+        "queue_limit": PROFILE_POOL_QUEUE,
+        "in_flight": _in_flight,
+        "task_timeout_s": PROFILE_TASK_TIMEOUT,
+        "task_submissions": PROFILE_TASK_SUBMISSIONS,
+        "group_inline": GROUP_INLINE,
+        "workers_ready": workers_ready(),
+    }
@@ -0,0 +1,526 @@
+from __future__ import annotations
+
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import and_, case, delete
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+from models import CandidateProfile, CandidateProfileEntry, ProfileJob, Submission, SubmissionAnalysis
+from nlp import analyzer_version, check_grouping
+from trait_counts import MAX_EXAMPLES, rank_traits
+from analysis_cache import analyzable, content_hash, load_analyses
+import profile_pool
+
+_VOTE_FIELDS = {1: "yes", 0: "neutral", -1: "no"}
+
+# Submission.comment as the profile code reads it: text the analyzer would skip
+# (neutral votes, blank comments) is blanked in SQL and never leaves the database
+_COMMENT = case(
+    (and_(Submission.vote != 0, func.btrim(Submission.comment) != ""), Submission.comment),
+    else_="",
+).label("comment")
+
+
+# -------------------------
+# Contributions
+# -------------------------
+
+def _contributions(db: Session, subs: Sequence[Tuple[int, int, str]]) -> Tuple[List[List[Tuple[int, str, str]]], bool]:
+    # subs: (submission_id, vote, comment) -> grouped (polarity, label, evidence) per submission,
+    # and False when the vector store was unavailable and the traits are ungrouped
+    # cache misses and grouping run in the profile process pool, not the request thread;
+    # neutral / blank submissions contribute nothing and skip the cache entirely
+    keep = [i for i, (_, vote, comment) in enumerate(subs) if analyzable(vote, comment)]
+    analyses = load_analyses(db, [subs[i] for i in keep], analyze=profile_pool.analyze_submissions)
+    grouped, ok = profile_pool.group_analyses(analyses)
+    out: List[List[Tuple[int, str, str]]] = [[] for _ in subs]
+    for i, results in zip(keep, grouped):
+        out[i] = results
+    return out, ok
+
+
+def _lock_profile(db: Session, candidate_id: int) -> CandidateProfile:
+    # create the row if needed, then serialize writers on it
+    db.execute(
+        insert(CandidateProfile)
+        .values(
+            candidate_id=candidate_id, yes=0, neutral=0, no=0,
+            pos_counts={}, neg_counts={}, pos_examples={}, neg_examples={},
+        )
+        .on_conflict_do_nothing(index_elements=[CandidateProfile.candidate_id])
+    )
+    return db.get(CandidateProfile, candidate_id, with_for_update=True, populate_existing=True)
+
+
+def _apply(profile: CandidateProfile, vote: int, traits: List, sign: int) -> Set[Tuple[bool, str]]:
+    """
+    Adds (sign=+1) or subtracts (sign=-1) one submission's contribution.
+    Adding appends to the example slots, which is exact when submissions
+    arrive newest first (full builds). Returns the (positive?, label) slots
+    it touched; incremental callers recompute those with _refill_examples.
+    """
+    field = _VOTE_FIELDS.get(vote)
+    if field:
+        setattr(profile, field, getattr(profile, field) + sign)
+
+    # copy so the JSONB columns are seen as changed
+    pos_counts = dict(profile.pos_counts)
+    neg_counts = dict(profile.neg_counts)
+    pos_examples = dict(profile.pos_examples)
+    neg_examples = dict(profile.neg_examples)
+
+    touched: Set[Tuple[bool, str]] = set()
+    for pol, label, evidence in traits:
+        counts, examples = (pos_counts, pos_examples) if pol > 0 else (neg_counts, neg_examples)
+
+        n = counts.get(label, 0) + sign
+        if n <= 0:
+            counts.pop(label, None)
+            examples.pop(label, None)
+            continue
+        counts[label] = n
+        touched.add((pol > 0, label))
+
+        slots = list(examples.get(label, []))
+        if sign > 0:
+            if len(slots) < MAX_EXAMPLES and evidence not in slots:
+                slots.append(evidence)
+        elif evidence in slots:
+            slots.remove(evidence)
+        examples[label] = slots
+
+    profile.pos_counts = pos_counts
+    profile.neg_counts = neg_counts
+    profile.pos_examples = pos_examples
+    profile.neg_examples = neg_examples
+    return touched
+
+
+def _refill_examples(db: Session, profile: CandidateProfile, touched: Set[Tuple[bool, str]]):
+    """
+    Recomputes the example slots of `touched` labels from the stored entries,
+    newest submission first, so they match what a full build (same order,
+    see _load_submissions) would pick after any mix of adds, edits and deletes.
+    """
+    touched = {
+        (positive, label) for positive, label in touched
+        if label in (profile.pos_counts if positive else profile.neg_counts)
+    }
+    if not touched:
+        return
+    db.flush()
+
+    pos_examples = dict(profile.pos_examples)
+    neg_examples = dict(profile.neg_examples)
+    fresh: Dict[Tuple[bool, str], List[str]] = {key: [] for key in touched}
+    entries = (
+        db.query(CandidateProfileEntry.traits)
+        .join(Submission, Submission.id == CandidateProfileEntry.submission_id)
+        .filter(CandidateProfileEntry.candidate_id == profile.candidate_id)
+        .order_by(Submission.created_at.desc(), Submission.id.desc())
+        .yield_per(1000)
+    )
+    unfilled = len(fresh)
+    for (traits,) in entries:
+        for pol, label, evidence in traits:
+            slots = fresh.get((pol > 0, label))
+            if slots is None or len(slots) >= MAX_EXAMPLES or evidence in slots:
+                continue
+            slots.append(evidence)
+            unfilled -= len(slots) == MAX_EXAMPLES
+        if not unfilled:
+            break
+    for (positive, label), slots in fresh.items():
+        (pos_examples if positive else neg_examples)[label] = slots
+
+    profile.pos_examples = pos_examples
+    profile.neg_examples = neg_examples
+
+
+# -------------------------
+# Incremental updates
+# -------------------------
+
+def reconcile_candidate(db: Session, candidate_id: int) -> int:
+    """
+    Brings one candidate's materialized profile in step with its current
+    submissions in a single pass: new or edited submissions (content_hash
+    mismatch) and ungrouped entries are re-applied, entries of deleted
+    submissions are subtracted.
+    Used by the profile_jobs workers. Returns how many submissions changed.
+    """
+    subs = (
+        db.query(Submission.id, Submission.vote, _COMMENT)
+        .filter(Submission.candidate_id == candidate_id)
+        .all()
+    )
+    if db.get(CandidateProfile, candidate_id) is None:
+        rebuild_candidate(db, candidate_id)
+        return len(subs)
+
+    hashes = {s.id: content_hash(s.vote, s.comment) for s in subs}
+    stored = {
+        sid: (h, grouped)
+        for sid, h, grouped in db.query(
+            CandidateProfileEntry.submission_id, CandidateProfileEntry.content_hash, CandidateProfileEntry.grouped
+        ).filter(CandidateProfileEntry.candidate_id == candidate_id)
+    }
+    changed = [s for s in subs if stored.get(s.id) != (hashes[s.id], True)]
+    gone = [sid for sid in stored if sid not in hashes]
+    if not changed and not gone:
+        db.commit()
+        return 0
+
+    # NLP runs before taking the row lock
+    contributions, grouped = _contributions(db, [(s.id, s.vote, s.comment) for s in changed])
+
+    profile = _lock_profile(db, candidate_id)
+    touched: Set[Tuple[bool, str]] = set()
+    for sid in gone:
+        entry = db.get(CandidateProfileEntry, sid, populate_existing=True)
+        if entry is not None:
+            touched |= _apply(profile, entry.vote, entry.traits, -1)
+            db.delete(entry)
+
+    for s, traits in zip(changed, contributions):
+        traits = [list(t) for t in traits]
+        entry = db.get(CandidateProfileEntry, s.id, populate_existing=True)
+        if entry is not None:
+            touched |= _apply(profile, entry.vote, entry.traits, -1)
+        else:
+            entry = CandidateProfileEntry(submission_id=s.id, candidate_id=candidate_id)
+            db.add(entry)
+        entry.vote = s.vote
+        entry.content_hash = hashes[s.id]
+        entry.traits = traits
+        entry.grouped = grouped
+        touched |= _apply(profile, s.vote, traits, +1)
+
+    _refill_examples(db, profile, touched)
+    db.commit()
+    return len(changed) + len(gone)
+
+
+def rebuild_candidate(db: Session, candidate_id: int) -> CandidateProfile:
+    """
+    Full recompute of one candidate's materialized profile from its submissions.
+    """
+    return rebuild_candidates(db, [candidate_id])[candidate_id]
+
+
+def rebuild_candidates(db: Session, candidate_ids: Sequence[int]) -> Dict[int, CandidateProfile]:
+    """
+    Full recompute of several candidates at once: one submissions query and
+    one batched NLP pass, so parsing, embeddings and trait grouping are
+    shared across candidates.
+    """
+    candidate_ids = sorted(set(candidate_ids))  # fixed lock order
+    if not candidate_ids:
+        return {}
+
+    subs = _load_submissions(db, candidate_ids)
+    contributions, grouped = _contributions(db, [(s.id, s.vote, s.comment) for s in subs])
+    return _store_rebuild(db, candidate_ids, subs, contributions, [grouped] * len(subs))
+
+
+def _load_submissions(db: Session, candidate_ids: Sequence[int]):
+    return (
+        db.query(Submission.id, Submission.candidate_id, Submission.vote, _COMMENT)
+        .filter(Submission.candidate_id.in_(candidate_ids))
+        .order_by(Submission.created_at.desc(), Submission.id.desc())
+        .all()
+    )
+
+
+def _store_rebuild(db: Session, candidate_ids: Sequence[int], subs, contributions, grouped: Sequence[bool]) -> Dict[int, CandidateProfile]:
+    # replaces the candidates' profile rows and entries with these contributions
+    # (grouped[i]: whether contributions[i] went through trait grouping)
+    locked = {cid: _lock_profile(db, cid) for cid in candidate_ids}
+    db.query(CandidateProfileEntry).filter(
+        CandidateProfileEntry.candidate_id.in_(candidate_ids)
+    ).delete(synchronize_session="fetch")
+    for profile in locked.values():
+        profile.yes = profile.neutral = profile.no = 0
+        profile.pos_counts, profile.neg_counts = {}, {}
+        profile.pos_examples, profile.neg_examples = {}, {}
+
+    entries = []
+    for s, traits, ok in zip(subs, contributions, grouped):
+        traits = [list(t) for t in traits]
+        entries.append({
+            "submission_id": s.id,
+            "candidate_id": s.candidate_id,
+            "vote": s.vote,
+            "content_hash": content_hash(s.vote, s.comment),
+            "traits": traits,
+            "grouped": ok,
+        })
+        _apply(locked[s.candidate_id], s.vote, traits, +1)
+    if entries:
+        db.execute(insert(CandidateProfileEntry), entries)
+
+    db.commit()
+    return {
+        p.candidate_id: p
+        for p in db.query(CandidateProfile)
+        .filter(CandidateProfile.candidate_id.in_(candidate_ids))
+        .populate_existing()
+    }
+
+
+def iter_build(db: Session, candidate_id: int, top_k: int = 8, batch_size: int = 64) -> Iterator[Tuple[str, Dict]]:
+    """
+    Progressive get_profile for the streaming endpoint. Yields (event, data):
+      "summary"  vote counts, straight from SQL, before any NLP
+      "partial"  top-k traits so far, after each batch of submissions when
+                 the profile has to be built from scratch
+      "final"    the get_profile result, after the build is stored
+    An already materialized profile only catches up on pending changes.
+    """
+    votes = vote_summaries(db, [candidate_id])[candidate_id]
+    yield "summary", {
+        "vote_summary": {k: votes[k] for k in ("yes", "neutral", "no", "score")},
+        "total": votes["total"],
+    }
+
+    job_version = db.query(ProfileJob.version).filter(ProfileJob.candidate_id == candidate_id).scalar()
+    if db.get(CandidateProfile, candidate_id) is not None:
+        if job_version is not None:
+            reconcile_candidate(db, candidate_id)
+            _finish_job(db, candidate_id, job_version)
+        yield "final", get_profile(db, candidate_id, top_k)
+        return
+
+    subs = _load_submissions(db, [candidate_id])
+    contributions: List = []
+    grouped: List[bool] = []
+    # scratch profile for the partial rankings; never added to the session
+    draft = CandidateProfile(
+        candidate_id=candidate_id, yes=0, neutral=0, no=0,
+        pos_counts={}, neg_counts={}, pos_examples={}, neg_examples={},
+    )
+    for start in range(0, len(subs), batch_size):
+        batch = subs[start:start + batch_size]
+        batch_contributions, ok = _contributions(db, [(s.id, s.vote, s.comment) for s in batch])
+        for s, traits in zip(batch, batch_contributions):
+            _apply(draft, s.vote, traits, +1)
+        contributions += batch_contributions
+        grouped += [ok] * len(batch)
+        yield "partial", {
+            "analyzed": len(contributions),
+            "total": len(subs),
+            "positives": rank_traits(draft.pos_counts, draft.pos_examples, top_k),
+            "negatives": rank_traits(draft.neg_counts, draft.neg_examples, top_k),
+        }
+
+    _store_rebuild(db, [candidate_id], subs, contributions, grouped)
+    if job_version is not None:
+        _finish_job(db, candidate_id, job_version)
+    yield "final", get_profile(db, candidate_id, top_k)
+
+
+def _finish_job(db: Session, candidate_id: int, version: int):
+    # the job's work was just done inline; same version check as
+    # profile_jobs._finish, so an edit that landed meanwhile keeps its job
+    db.execute(delete(ProfileJob).where(ProfileJob.candidate_id == candidate_id, ProfileJob.version == version))
+    db.commit()
+
+
+# -------------------------
+# Reads
+# -------------------------
+
+def get_profile(db: Session, candidate_id: int, top_k: int = 8) -> Dict:
+    """
+    Single-row read of the materialized profile (built on first access).
+    Writes are applied by the profile_jobs workers, so the stored profile can
+    lag the latest votes; `stale_seconds` is how long the oldest change not
+    yet applied has been waiting (0 when nothing is pending). `degraded`
+    means some traits were stored ungrouped while the vector store was down.
+    """
+    return get_profiles(db, [candidate_id], top_k)[candidate_id]
+
+
+def get_profiles(db: Session, candidate_ids: Sequence[int], top_k: int = 8) -> Dict[int, Dict]:
+    """
+    get_profile for many candidates: three queries for the stored rows,
+    their pending jobs and ungrouped entries, plus one batched
+    rebuild_candidates for any that were never materialized.
+    """
+    stored = {
+        p.candidate_id: p
+        for p in db.query(CandidateProfile).filter(CandidateProfile.candidate_id.in_(candidate_ids))
+    }
+    missing = [cid for cid in candidate_ids if cid not in stored]
+    if missing:
+        stored.update(rebuild_candidates(db, missing))
+
+    waiting = dict(
+        db.query(ProfileJob.candidate_id, func.extract("epoch", func.now() - ProfileJob.first_requested_at))
+        .filter(ProfileJob.candidate_id.in_(candidate_ids))
+        .all()
+    )
+    degraded = ungrouped_candidates(db, candidate_ids)
+
+    out: Dict[int, Dict] = {}
+    for cid in candidate_ids:
+        profile, age = stored[cid], waiting.get(cid)
+        out[cid] = {
+            "vote_summary": {
+                "yes": profile.yes,
+                "neutral": profile.neutral,
+                "no": profile.no,
+                "score": profile.yes - profile.no,
+            },
+            "positives": rank_traits(profile.pos_counts, profile.pos_examples, top_k),
+            "negatives": rank_traits(profile.neg_counts, profile.neg_examples, top_k),
+            "computed_at": profile.updated_at,
+            "pending": age is not None,
+            "stale_seconds": round(max(float(age), 0.0), 3) if age is not None else 0.0,
+            "degraded": cid in degraded,
+        }
+    return out
+
+
+def vote_summaries(db: Session, candidate_ids: Sequence[int], user_id: Optional[str] = None) -> Dict[int, Dict]:
+    """
+    Vote counts, comment count and `user_id`'s own vote/comment for many
+    candidates in one GROUP BY over submissions (COUNT(*) FILTER per vote).
+    Candidates without submissions get zeros.
+    """
+    mine = Submission.user_id == user_id
+    rows = (
+        db.query(
+            Submission.candidate_id,
+            func.count().filter(Submission.vote == 1),
+            func.count().filter(Submission.vote == 0),
+            func.count().filter(Submission.vote == -1),
+            func.count().filter(Submission.comment != ""),
+            func.max(Submission.vote).filter(mine),
+            func.max(Submission.comment).filter(mine),
+        )
+        .filter(Submission.candidate_id.in_(candidate_ids))
+        .group_by(Submission.candidate_id)
+    )
+    out = {
+        cid: {"yes": 0, "neutral": 0, "no": 0, "score": 0, "total": 0, "comments": 0, "my_vote": None, "my_comment": None}
+        for cid in candidate_ids
+    }
+    for cid, yes, neutral, no, comments, my_vote, my_comment in rows:
+        out[cid] = {
+            "yes": yes, "neutral": neutral, "no": no, "score": yes - no,
+            "total": yes + neutral + no, "comments": comments,
+            "my_vote": my_vote, "my_comment": my_comment,
+        }
+    return out
+
+
+def ungrouped_candidates(db: Session, candidate_ids: Sequence[int]) -> Set[int]:
+    # candidates with entries stored while trait grouping was unavailable
+    return {
+        cid for (cid,) in
+        db.query(CandidateProfileEntry.candidate_id)
+        .filter(CandidateProfileEntry.candidate_id.in_(candidate_ids), CandidateProfileEntry.grouped.is_(False))
+        .distinct()
+    }
+
+
+def check_candidate(db: Session, candidate_id: int) -> List[str]:
+    """
+    Checks the incremental state without re-running the NLP or regrouping:
+    vote counts against SQL, one fresh entry per submission, trait counts
+    and examples (newest submission first, as a full build picks them)
+    against the entries, and each entry against its cached analysis (same
+    traits in the same order, each label one that grouping could have
+    picked; see nlp.check_grouping). Entries without a current cached
+    analysis are only counted, not compared.
+    Read-only, the vector store included. Returns a list of human-readable
+    mismatches (empty when consistent).
+    """
+    problems: List[str] = []
+    profile: Optional[CandidateProfile] = db.get(CandidateProfile, candidate_id)
+    if profile is None:
+        return ["not materialized"]
+
+    subs = (
+        db.query(Submission.id, Submission.vote, _COMMENT)
+        .filter(Submission.candidate_id == candidate_id)
+        .order_by(Submission.created_at.desc())
+        .all()
+    )
+
+    votes = vote_summaries(db, [candidate_id])[candidate_id]
+    for field in _VOTE_FIELDS.values():
+        n = votes[field]
+        if getattr(profile, field) != n:
+            problems.append(f"{field}: stored={getattr(profile, field)} actual={n}")
+
+    # newest first, the order full builds and _refill_examples pick examples in
+    all_entries = (
+        db.query(CandidateProfileEntry.submission_id, CandidateProfileEntry.content_hash, CandidateProfileEntry.traits)
+        .outerjoin(Submission, Submission.id == CandidateProfileEntry.submission_id)
+        .filter(CandidateProfileEntry.candidate_id == candidate_id)
+        .order_by(Submission.created_at.desc(), CandidateProfileEntry.submission_id.desc())
+        .all()
+    )
+    entries = {e.submission_id: e for e in all_entries}
+    for s in subs:
+        e = entries.pop(s.id, None)
+        if e is None:
+            problems.append(f"submission {s.id}: no entry")
+        elif e.content_hash != content_hash(s.vote, s.comment):
+            problems.append(f"submission {s.id}: entry is stale")
+    for sid in entries:
+        problems.append(f"submission {sid}: entry for a deleted submission")
+
+    summed: Dict[bool, Dict[str, int]] = {True: {}, False: {}}
+    picked: Dict[bool, Dict[str, List[str]]] = {True: {}, False: {}}
+    for e in all_entries:
+        for pol, label, evidence in e.traits:
+            summed[pol > 0][label] = summed[pol > 0].get(label, 0) + 1
+            slots = picked[pol > 0].setdefault(label, [])
+            if len(slots) < MAX_EXAMPLES and evidence not in slots:
+                slots.append(evidence)
+    for key, positive, stored in (("positives", True, profile.pos_counts), ("negatives", False, profile.neg_counts)):
+        expected = summed[positive]
+        for label in sorted(set(expected) | set(stored)):
+            if expected.get(label, 0) != stored.get(label, 0):
+                problems.append(f"{key} '{label}': stored={stored.get(label, 0)} entries={expected.get(label, 0)}")
+
+    analyses = {
+        sid: (h, traits)
+        for sid, h, traits in db.query(
+            SubmissionAnalysis.submission_id, SubmissionAnalysis.content_hash, SubmissionAnalysis.traits
+        )
+        .join(Submission, Submission.id == SubmissionAnalysis.submission_id)
+        .filter(Submission.candidate_id == candidate_id, SubmissionAnalysis.analyzer_version == analyzer_version())
+    }
+    pairs: Dict[Tuple[str, str], List[int]] = {}
+    unverified = 0
+    for e in all_entries:
+        if not e.traits:
+            continue
+        h, traits = analyses.get(e.submission_id, (None, None))
+        if h != e.content_hash:
+            unverified += 1
+            continue
+        if [(p, ev) for p, _, ev in traits] != [(p, ev) for p, _, ev in e.traits]:
+            problems.append(f"submission {e.submission_id}: entry traits differ from its cached analysis")
+            continue
+        for (_, trait, _), (_, label, _) in zip(traits, e.traits):
+            pairs.setdefault((trait, label), []).append(e.submission_id)
+    for trait, label in check_grouping(list(pairs)):
+        sids = pairs[(trait, label)]
+        problems.append(f"'{trait}' grouped as '{label}', which isn't a cluster within the threshold (submissions {sids[:5]})")
+    if unverified:
+        print(f"[profiles] candidate {candidate_id}: {unverified} entries without a current cached analysis, not compared")
+
+    for key, positive, examples in (("positives", True, profile.pos_examples), ("negatives", False, profile.neg_examples)):
+        for label in sorted(set(examples) | set(picked[positive])):
+            slots, expected = examples.get(label, []), picked[positive].get(label, [])
+            if slots != expected:
+                problems.append(f"{key} '{label}': examples {slots!r}, newest entries give {expected!r}")
+
+    return problems
@@ -1,54 +1,161 @@
 from __future__ import annotations
 
 import os
-from typing import List, Optional, Tuple
+import threading
+import uuid
+from typing import Dict, List, Optional
 
-from qdrant_client import QdrantClient
-from qdrant_client.http import models as qm
+import vector_store
+from circuit_breaker import CircuitOpen
+from trait_index import TraitIndex
+from vector_store import Hit, Point, PointId, VectorStore
 
-QDRANT_URL = os.getenv("QDRANT_URL", "http://127.0.0.1:6333")
 COLLECTION = "traits_v1"
 VECTOR_SIZE = 384  # all-MiniLM-L6-v2 outputs 384 dims
 
-_client = QdrantClient(url=QDRANT_URL)
+# in-process mirror of COLLECTION; other workers' upserts show up on refresh
+TRAIT_INDEX_ENABLED = os.getenv("TRAIT_INDEX_ENABLED", "1") == "1"
+TRAIT_INDEX_REFRESH_SECONDS = float(os.getenv("TRAIT_INDEX_REFRESH_SECONDS", "60"))
 
-def ensure_collection():
-    existing = [c.name for c in _client.get_collections().collections]
-    if COLLECTION in existing:
+_store: Optional[VectorStore] = None
+_index = TraitIndex(VECTOR_SIZE)
+# profile pool workers' store counters, summed here so reporting them never
+# opens a store in this process
+_pool_counters: Dict[str, float] = {}
+_pool_lock = threading.Lock()
+
+def get_store() -> VectorStore:
+    # created on first use so importing this module doesn't touch the network stack;
+    # VECTOR_BACKEND picks remote Qdrant, local Qdrant or NumPy (see vector_store.from_config)
+    global _store
+    if _store is None:
+        _store = vector_store.from_config(COLLECTION, VECTOR_SIZE)
+    return _store
+
+def flush():
+    # writes out buffered upserts now (end of a pool task, shutdown); a store
+    # that's down keeps them buffered and retries on its own
+    if _store is None:
         return
-    _client.create_collection(
-        collection_name=COLLECTION,
-        vectors_config=qm.VectorParams(size=VECTOR_SIZE, distance=qm.Distance.COSINE),
-    )
-
-from qdrant_client.http import models as qm
-
-def search_trait(vector: List[float], limit: int = 1) -> List[qm.ScoredPoint]:
-    ensure_collection()
-
-    res = _client.query_points(
-        collection_name=COLLECTION,
-        query=vector,
-        limit=limit,
-        with_payload=True,
-    )
-    # res is a QueryResponse with .points
-    return list(res.points)
-
-def upsert_trait(point_id: int, vector: List[float], label: str):
-    ensure_collection()
-    _client.upsert(
-        collection_name=COLLECTION,
-        points=[
-            qm.PointStruct(
-                id=point_id,
-                vector=vector,
-                payload={"label": label},
-            )
-        ],
-    )
+    try:
+        _store.flush()
+    except CircuitOpen:
+        pass
+    except Exception as e:
+        print(f"[vector_store] flush failed, upserts stay buffered: {e!r}")
+
+def add_pool_counters(delta: Dict[str, float]):
+    with _pool_lock:
+        for k, v in delta.items():
+            _pool_counters[k] = _pool_counters.get(k, 0) + v
+
+def store_stats() -> dict:
+    # doesn't create the store just to report on it; ops cover this process
+    # and the profile pool workers
+    with _pool_lock:
+        counters = dict(_pool_counters)
+    if _store is None:
+        return {"loaded": False, "ops": vector_store.op_stats(counters)} if counters else {"loaded": False}
+    for k, v in _store.counters().items():
+        counters[k] = counters.get(k, 0) + v
+    out = {"backend": type(_store).__name__, "ops": vector_store.op_stats(counters)}
+    if _store.breaker is not None:
+        # this process's breaker; pool workers each keep their own
+        out["breaker"] = _store.breaker.stats()
+    return out
+
+def close_store():
+    global _store
+    if _store is not None:
+        _store.close()
+        _store = None
+
+def load_trait_index() -> int:
+    """
+    Pulls every (id, vector, label) of COLLECTION into the in-process index.
+    Returns the number of labels loaded.
+    """
+    if not get_store().mirror:
+        return 0
+    points = [
+        (point_id, vector, label)
+        for point_id, vector, label in get_store().scan()
+        if isinstance(label, str) and label
+    ]
+    _index.load(points)
+    print(f"[trait_index] loaded {len(points)} labels")
+    return len(points)
+
+_index_load_attempted = False
+
+def _warm_index() -> bool:
+    # True when lookups can be served from memory; Qdrant is only used cold
+    global _index_load_attempted
+    if not TRAIT_INDEX_ENABLED or not get_store().mirror:
+        return False
+    if not _index.ready:
+        # lazy startup: try once on first use, then stay on Qdrant until a refresh works
+        if _index_load_attempted:
+            return False
+        _index_load_attempted = True
+        try:
+            load_trait_index()
+        except Exception as e:
+            print(f"[trait_index] not loaded, using Qdrant: {e!r}")
+            return False
+    if _index.age() > TRAIT_INDEX_REFRESH_SECONDS:
+        try:
+            load_trait_index()
+        except CircuitOpen:
+            pass  # store known down: keep serving the stale index without waiting on it
+        except Exception as e:
+            print(f"[trait_index] refresh failed, serving stale index: {e!r}")
+    return True
+
+def search_trait(vector: List[float], limit: int = 1) -> List[Hit]:
+    # (point_id, score, label) best first
+    if _warm_index():
+        return _index.search(vector, limit=limit)
+    return get_store().search(vector, limit=limit)
+
+def search_traits(vectors: List[List[float]], limit: int = 1) -> List[List[Hit]]:
+    # one round trip for many lookups; results line up with `vectors`
+    if not vectors:
+        return []
+    if _warm_index():
+        return _index.search_batch(vectors, limit=limit)
+    return get_store().search_batch(vectors, limit=limit)
+
+# cluster point ids are derived from the label: every worker and host picks
+# the same id for the same new cluster, so concurrent creates collapse into
+# one idempotent upsert instead of colliding or duplicating
+_TRAIT_ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, f"personality-insights/{COLLECTION}")
+
+def trait_point_id(label: str) -> str:
+    return str(uuid.uuid5(_TRAIT_ID_NAMESPACE, label))
+
+
+def upsert_trait(point_id: PointId, vector: List[float], label: str):
+    upsert_traits([(point_id, vector, label)])
+
+def upsert_traits(points: List[Point]):
+    # points: (point_id, vector, label); one write for the whole batch
+    if not points:
+        return
+    try:
+        get_store().upsert(points)
+    except Exception as e:
+        # the store kept them buffered; with a warm index, lookups carry on from
+        # memory and the new clusters reach the store once it's back
+        if not _index.ready:
+            raise
+        if not isinstance(e, CircuitOpen):
+            print(f"[vector_store] upsert failed, kept buffered: {e!r}")
+    if get_store().mirror:
+        for point_id, vector, label in points:
+            _index.add(point_id, vector, label)
+
 def reset_collection():
-    existing = [c.name for c in _client.get_collections().collections]
-    if COLLECTION in existing:
-        _client.delete_collection(collection_name=COLLECTION)
-    ensure_collection()
+    get_store().reset()
+    if _index.ready:
+        _index.load([])
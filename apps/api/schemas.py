@@ -142,4 +142,20 @@ class CandidateProfileOut(BaseModel):
     candidate_id: int
     vote_summary: VoteSummary
     positives: list[TraitItem]
-    negatives: list[TraitItem]
\ No newline at end of file
+    negatives: list[TraitItem]
+    # profiles are recomputed in the background; these say how fresh this one is
+    computed_at: Optional[datetime] = None
+    pending: bool = False
+    stale_seconds: float = 0.0
+    # some submissions' traits are ungrouped (vector store was unavailable)
+    degraded: bool = False
+
+class CandidateVotes(VoteSummary):
+    # per-candidate aggregates for list views, one GROUP BY for the whole list
+    total: int
+    comments: int
+    my_vote: Optional[int] = None      # the caller's own submission, if any
+    my_comment: Optional[str] = None
+
+class CandidateWithVotesOut(CandidateOut):
+    votes: Optional[CandidateVotes] = None  # only with ?summary=true
@@ -0,0 +1,94 @@
+"""
+Parity and throughput check of the onnx embedding backend against torch,
+over the trait vocabulary (synonym tables + labels already in Qdrant).
+
+    cd apps/api
+    python -m scripts.bench_embeddings [--no-qdrant] [--repeat 5]
+
+Parity: per-label cosine between the two backends, and whether each
+label's nearest neighbour in the vocabulary is the same under both.
+"""
+from dotenv import load_dotenv
+load_dotenv()
+
+import argparse
+import resource
+import time
+
+import numpy as np
+
+from embeddings import load_model
+
+
+def vocabulary(with_qdrant: bool):
+    from nlp import get_synonyms
+
+    phrases, words, _ = get_synonyms()
+    vocab = set(words) | set(words.values())
+    for phrase, label in phrases.phrases():
+        vocab |= {phrase, label}
+    if with_qdrant:
+        try:
+            import qdrant_utils
+            vocab |= {label for _, _, label in qdrant_utils.get_store().scan() if label}
+        except Exception as e:
+            print(f"(qdrant labels skipped: {e!r})")
+    return sorted(vocab)
+
+
+def rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def throughput(model, texts, batch_size: int, repeat: int) -> float:
+    model.encode(texts[:batch_size], batch_size=batch_size, normalize_embeddings=True)  # warmup
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        model.encode(texts, batch_size=batch_size, normalize_embeddings=True)
+    return len(texts) * repeat / (time.perf_counter() - t0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--no-qdrant", action="store_true", help="only use the synonym tables")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    texts = vocabulary(not args.no_qdrant)
+    print(f"vocabulary: {len(texts)} labels")
+
+    models, vecs = {}, {}
+    for name in ("torch", "onnx"):
+        before = rss_mb()
+        t0 = time.perf_counter()
+        models[name] = load_model(name)
+        print(f"{name}: loaded in {time.perf_counter() - t0:.2f}s, peak rss +{rss_mb() - before:.0f} MB")
+        vecs[name] = np.asarray(models[name].encode(texts, normalize_embeddings=True), dtype=np.float32)
+
+    a, b = vecs["torch"], vecs["onnx"]
+    cos = (a * b).sum(axis=1)
+    print(f"\ncosine torch vs onnx: min={cos.min():.4f} mean={cos.mean():.4f} p01={np.percentile(cos, 1):.4f}")
+    print(f"labels below 0.99: {(cos < 0.99).sum()}")
+    for i in np.argsort(cos)[:5]:
+        print(f"  {cos[i]:.4f}  {texts[i]!r}")
+
+    def nearest(v):
+        sims = v @ v.T
+        np.fill_diagonal(sims, -1)
+        return sims.argmax(axis=1), sims.max(axis=1)
+
+    na, sa = nearest(a)
+    nb, sb = nearest(b)
+    print(f"nearest-label agreement: {(na == nb).mean():.2%}")
+    print(f"group decision (>=0.75) agreement: {((sa >= 0.75) == (sb >= 0.75)).mean():.2%}")
+
+    print("\nthroughput (texts/s):")
+    for batch_size in (1, 32):
+        row = "  ".join(
+            f"{name}={throughput(models[name], texts, batch_size, args.repeat):8.1f}" for name in models
+        )
+        print(f"  batch={batch_size:<3} {row}")
+
+
+if __name__ == "__main__":
+    main()
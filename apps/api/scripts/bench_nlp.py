@@ -0,0 +1,225 @@
+"""
+Benchmarks the trimmed spaCy pipeline (SPACY_TRIMMED=1) against the full
+en_core_web_sm pipeline on the same comments, and checks that both produce
+identical analyses / trait counts.
+
+    cd apps/api
+    python -m scripts.bench_nlp                 # synthetic corpus
+    python -m scripts.bench_nlp --from-db       # every submission in DATABASE_URL
+    python -m scripts.bench_nlp -n 2000
+    python -m scripts.bench_nlp --parity        # + diff against build_profile_legacy
+    python -m scripts.bench_nlp --parity --grouped
+
+Each configuration runs in its own process so load time and peak RSS are
+measured cleanly. Trait grouping (embeddings + Qdrant) is not part of this
+benchmark; it compares the spaCy/VADER stages only.
+
+--parity also diffs, per comment, the single-parse analyses build_profile
+uses against the analyze_comment + canonicalize path of
+build_profile_legacy, and prints every divergence (exit status 1 if any).
+--grouped additionally compares nlp.build_profile with
+nlp.build_profile_legacy end to end; that groups traits, so it needs the
+vector store and creates clusters in it.
+"""
+import argparse
+import multiprocessing as mp
+import os
+import random
+import resource
+import sys
+import time
+from typing import Dict, List, Tuple
+
+_SUBJECTS = ["He", "She", "They", "Honestly he", "Overall she"]
+_PARTS = [
+    "is really nice and easy to talk to",
+    "talks over people a lot",
+    "seemed kind of arrogant",
+    "works hard and is always on time",
+    "was a natural leader in the group",
+    "came across disrespectful",
+    "is funny",
+    "is a bit quiet",
+    "gets along with others",
+    "didn't try at all",
+]
+_SHORT = ["chiller", "rude", "super friendly", "lazy", "team player"]
+
+
+def synthetic_corpus(n: int, seed: int = 7) -> List[Tuple[int, str]]:
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        vote = rng.choice([1, 1, -1, 0])
+        if rng.random() < 0.2:
+            out.append((vote, rng.choice(_SHORT)))
+            continue
+        a, b = rng.sample(_PARTS, 2)
+        joiner = rng.choice([" but ", " and ", ". Sometimes he ", ", though he "])
+        out.append((vote, f"{rng.choice(_SUBJECTS)} {a}{joiner}{b}."))
+    return out
+
+
+def db_corpus() -> List[Tuple[int, str]]:
+    from dotenv import load_dotenv
+    load_dotenv()
+    from db import SessionLocal
+    from models import Submission
+
+    with SessionLocal() as db:
+        return [(v, c) for v, c in db.query(Submission.vote, Submission.comment)]
+
+
+def _rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _run(trimmed: bool, corpus, out_q, parity: bool = False, grouped: bool = False):
+    os.environ["SPACY_TRIMMED"] = "1" if trimmed else "0"
+    import nlp
+
+    rss0 = _rss_mb()
+    t = time.perf_counter()
+    pipeline = nlp.get_nlp()
+    load_s = time.perf_counter() - t
+    rss_loaded = _rss_mb()
+
+    analyzable = [(v, c) for v, c in corpus if v != 0 and c.strip()]
+
+    # single-parse path (build_profile)
+    t = time.perf_counter()
+    analyses = nlp.analyze_submissions(corpus)
+    pipe_s = time.perf_counter() - t
+
+    # string path (build_profile_legacy): analyze_comment, then canonicalize per phrase
+    t = time.perf_counter()
+    raw = [nlp.analyze_comment(comment, vote) for vote, comment in analyzable]
+    analyze_s = time.perf_counter() - t
+
+    t = time.perf_counter()
+    legacy = [[(p, nlp.canonicalize(tr), ev) for p, tr, ev in results] for results in raw]
+    canon_s = time.perf_counter() - t
+    canon_n = sum(len(r) for r in raw)
+    legacy_s = analyze_s + canon_s
+
+    divergences = []
+    if parity:
+        single = [a for a, (v, c) in zip(analyses, corpus) if v != 0 and c.strip()]
+        for (vote, comment), new, old in zip(analyzable, single, legacy):
+            new, old = [tuple(r) for r in new], [tuple(r) for r in old]
+            if new != old:
+                divergences.append({"vote": vote, "comment": comment, "new": new, "legacy": old})
+
+    profiles = None
+    if grouped:
+        profiles = {
+            "new": nlp.build_profile(corpus, top_k=None),
+            "legacy": nlp.build_profile_legacy(corpus, top_k=None),
+        }
+
+    out_q.put({
+        "config": "trimmed" if trimmed else "full",
+        "pipes": pipeline.pipe_names,
+        "load_s": load_s,
+        "model_rss_mb": rss_loaded - rss0,
+        "peak_rss_mb": _rss_mb(),
+        "comments": len(analyzable),
+        "pipe_ms_per_comment": 1000 * pipe_s / max(len(analyzable), 1),
+        "legacy_ms_per_comment": 1000 * legacy_s / max(len(analyzable), 1),
+        "canonicalize_us_per_call": 1e6 * canon_s / max(canon_n, 1),
+        "analyses": analyses,
+        "legacy": legacy,
+        "divergences": divergences,
+        "profiles": profiles,
+    })
+
+
+def _counts(analyses):
+    counts = {}
+    for results in analyses:
+        for pol, trait, _ in results:
+            counts[(pol, trait)] = counts.get((pol, trait), 0) + 1
+    return counts
+
+
+def _profile_diff(new: Dict, old: Dict) -> List[str]:
+    # label / count / examples differences between two build_profile payloads
+    out = []
+    for key in ("positives", "negatives"):
+        a = {t["label"]: (t["count"], t["examples"]) for t in new[key]}
+        b = {t["label"]: (t["count"], t["examples"]) for t in old[key]}
+        for label in sorted(set(a) | set(b)):
+            if a.get(label) != b.get(label):
+                out.append(f"{key} {label!r}: build_profile={a.get(label)} legacy={b.get(label)}")
+    return out
+
+
+def _report_parity(r: Dict, show: int) -> int:
+    # prints the divergences of one configuration; returns how many there were
+    div = r["divergences"]
+    print(f"\n[{r['config']}] single-parse vs legacy analyses: {len(div)} of {r['comments']} comment(s) diverge")
+    for d in div[:show]:
+        print(f"  vote={d['vote']:+d} {d['comment']!r}")
+        print(f"    build_profile: {d['new']}")
+        print(f"    legacy:        {d['legacy']}")
+    if len(div) > show:
+        print(f"  ... {len(div) - show} more (--show)")
+    n = len(div)
+    if r["profiles"] is not None:
+        diff = _profile_diff(r["profiles"]["new"], r["profiles"]["legacy"])
+        print(f"[{r['config']}] build_profile vs build_profile_legacy: {len(diff)} difference(s)")
+        for line in diff[:show]:
+            print(f"  {line}")
+        n += len(diff)
+    return n
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--from-db", action="store_true")
+    parser.add_argument("-n", type=int, default=1000, help="synthetic corpus size")
+    parser.add_argument("--parity", action="store_true", help="diff against the build_profile_legacy path")
+    parser.add_argument("--grouped", action="store_true", help="with --parity: also compare whole grouped profiles (writes clusters)")
+    parser.add_argument("--show", type=int, default=20, help="divergences printed per configuration")
+    args = parser.parse_args()
+    if args.grouped and not args.parity:
+        parser.error("--grouped needs --parity")
+
+    corpus = db_corpus() if args.from_db else synthetic_corpus(args.n)
+    ctx = mp.get_context("spawn")
+
+    results = {}
+    for trimmed in (False, True):
+        q = ctx.Queue()
+        p = ctx.Process(target=_run, args=(trimmed, corpus, q, args.parity, args.grouped))
+        p.start()
+        r = q.get()
+        p.join()
+        results[r["config"]] = r
+
+    full, trim = results["full"], results["trimmed"]
+    keys = ["load_s", "model_rss_mb", "peak_rss_mb", "pipe_ms_per_comment", "legacy_ms_per_comment", "canonicalize_us_per_call"]
+    print(f"comments analyzed: {full['comments']}")
+    print(f"full pipes:    {full['pipes']}")
+    print(f"trimmed pipes: {trim['pipes']}")
+    print(f"\n{'metric':<26}{'full':>12}{'trimmed':>12}{'change':>10}")
+    for k in keys:
+        a, b = full[k], trim[k]
+        change = f"{(b - a) / a:+.1%}" if a else "-"
+        print(f"{k:<26}{a:>12.3f}{b:>12.3f}{change:>10}")
+
+    same_pipe = full["analyses"] == trim["analyses"]
+    same_legacy = full["legacy"] == trim["legacy"]
+    same_counts = _counts(full["analyses"]) == _counts(trim["analyses"])
+    print(f"\nidentical single-parse analyses: {same_pipe}")
+    print(f"identical legacy analyses:       {same_legacy}")
+    print(f"identical trait counts:          {same_counts}")
+
+    if not args.parity:
+        return 0
+    diverged = sum(_report_parity(results[config], args.show) for config in ("full", "trimmed"))
+    return 1 if diverged else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+"""
+Exports all-MiniLM-L6-v2 to ONNX and applies int8 dynamic quantization,
+producing the model used by EMBED_BACKEND=onnx.
+
+    cd apps/api
+    python -m scripts.export_onnx                      # -> models/all-MiniLM-L6-v2-int8.onnx
+    python -m scripts.bench_embeddings                 # parity + throughput vs torch
+
+Needs torch, sentence-transformers and onnx (export/quantization only).
+"""
+import argparse
+import os
+
+# the export reads the torch model; don't let embeddings try to load the onnx one
+os.environ["EMBED_BACKEND"] = "torch"
+
+import torch
+from onnxruntime.quantization import QuantType, quantize_dynamic
+from sentence_transformers import SentenceTransformer
+
+from embeddings import EMBED_ONNX_PATH, MODEL_NAME
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", default=EMBED_ONNX_PATH, help="quantized model path")
+    parser.add_argument("--opset", type=int, default=17)
+    args = parser.parse_args()
+
+    out_dir = os.path.dirname(args.out) or "."
+    os.makedirs(out_dir, exist_ok=True)
+    fp32_path = os.path.join(out_dir, f"{MODEL_NAME}-fp32.onnx")
+
+    st = SentenceTransformer(MODEL_NAME, device="cpu")
+    hf = st[0].auto_model.eval()
+    dummy = st.tokenizer(["a short warmup sentence"], return_tensors="pt")
+    names = ["input_ids", "attention_mask", "token_type_ids"]
+    axes = {"batch": 0, "seq": 1}
+
+    with torch.no_grad():
+        torch.onnx.export(
+            hf,
+            tuple(dummy[n] for n in names),
+            fp32_path,
+            input_names=names,
+            output_names=["last_hidden_state"],
+            dynamic_axes={n: {v: k for k, v in axes.items()} for n in names + ["last_hidden_state"]},
+            opset_version=args.opset,
+            dynamo=False,
+        )
+    print(f"exported {fp32_path} ({os.path.getsize(fp32_path) / 1e6:.1f} MB)")
+
+    quantize_dynamic(fp32_path, args.out, weight_type=QuantType.QInt8)
+    print(f"quantized {args.out} ({os.path.getsize(args.out) / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
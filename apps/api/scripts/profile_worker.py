@@ -0,0 +1,38 @@
+"""
+Standalone worker for the profile recompute queue (profile_jobs.py), for
+running the NLP away from the API processes. Set PROFILE_QUEUE_WORKERS=0 on
+the API when using it.
+
+    cd apps/api
+    python -m scripts.profile_worker              # run until interrupted
+    python -m scripts.profile_worker --drain      # process due jobs, then exit
+"""
+from dotenv import load_dotenv
+load_dotenv()
+
+import argparse
+import time
+
+from db import SessionLocal
+import profile_jobs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--drain", action="store_true", help="exit once no job is due")
+    parser.add_argument("--batch", type=int, default=profile_jobs.PROFILE_QUEUE_BATCH)
+    args = parser.parse_args()
+
+    while True:
+        with SessionLocal() as db:
+            claimed = profile_jobs.run_once(db, limit=args.batch)
+        if claimed:
+            print(f"[profile_jobs] {profile_jobs.stats()}")
+        elif args.drain:
+            break
+        else:
+            time.sleep(profile_jobs.PROFILE_QUEUE_POLL_SECONDS)
+
+
+if __name__ == "__main__":
+    main()
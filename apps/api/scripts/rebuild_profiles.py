@@ -0,0 +1,64 @@
+"""
+Checks materialized candidate_profiles against their submissions, entries
+and cached analyses (profiles.check_candidate; read-only, no new trait
+clusters) and rebuilds the ones that drifted.
+
+    cd apps/api
+    python -m scripts.rebuild_profiles                 # check + rebuild mismatches
+    python -m scripts.rebuild_profiles --dry-run       # only report
+    python -m scripts.rebuild_profiles --candidate 12 --force
+    python -m scripts.rebuild_profiles --purge-analyses  # also drop stale analysis-cache rows
+"""
+from dotenv import load_dotenv
+load_dotenv()
+
+import argparse
+import sys
+
+from db import SessionLocal
+from models import Candidate
+from analysis_cache import purge_stale_analyses
+import profiles
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--candidate", type=int, action="append", help="candidate id (repeatable); default: all")
+    parser.add_argument("--dry-run", action="store_true", help="report mismatches without rebuilding")
+    parser.add_argument("--force", action="store_true", help="rebuild even when consistent")
+    parser.add_argument("--purge-analyses", action="store_true", help="first delete analysis-cache rows of older analyzer versions")
+    args = parser.parse_args()
+    if args.purge_analyses and args.dry_run:
+        parser.error("--purge-analyses writes; drop --dry-run")
+
+    if args.purge_analyses:
+        with SessionLocal() as db:
+            print(f"purged {purge_stale_analyses(db)} stale analysis row(s)")
+
+    with SessionLocal() as db:
+        ids = args.candidate or [cid for (cid,) in db.query(Candidate.id).order_by(Candidate.id)]
+
+    drifted = 0
+    for cid in ids:
+        with SessionLocal() as db:
+            problems = profiles.check_candidate(db, cid)
+
+        if problems:
+            drifted += 1
+            print(f"candidate {cid}: {len(problems)} mismatch(es)")
+            for p in problems:
+                print(f"  - {p}")
+        else:
+            print(f"candidate {cid}: ok")
+
+        if (problems or args.force) and not args.dry_run:
+            with SessionLocal() as db:
+                profiles.rebuild_candidate(db, cid)
+            print(f"candidate {cid}: rebuilt")
+
+    print(f"{drifted}/{len(ids)} candidate(s) drifted")
+    return 1 if drifted and args.dry_run else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""
+Offline re-clustering of the trait vocabulary. Pulls every cluster label +
+vector from the vector store and every canonical trait in the analysis
+cache (embedded here), clusters them in one vectorized pass
+(trait_clusters.cluster_labels) and writes the label -> canonical label
+remap that request-time grouping reads (TRAIT_REMAP_PATH).
+
+    cd apps/api
+    python -m scripts.recluster_traits                    # write the remap
+    python -m scripts.recluster_traits --dry-run --show 20
+    python -m scripts.recluster_traits --threshold 0.8 --no-analyses
+
+Stored profiles keep their old labels until rebuilt:
+    python -m scripts.rebuild_profiles --force
+"""
+from dotenv import load_dotenv
+load_dotenv()
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+import qdrant_utils
+import trait_clusters
+
+
+def cached_traits() -> set:
+    # distinct canonical traits of the current analyzer version
+    from db import SessionLocal
+    from models import SubmissionAnalysis
+    from nlp import analyzer_version
+
+    traits = set()
+    with SessionLocal() as db:
+        rows = (
+            db.query(SubmissionAnalysis.traits)
+            .filter(SubmissionAnalysis.analyzer_version == analyzer_version())
+            .yield_per(1000)
+        )
+        for (results,) in rows:
+            traits.update(trait for _, trait, _ in results)
+    return traits
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threshold", type=float, default=0.75, help="cosine similarity to join a cluster (default: group_trait's)")
+    parser.add_argument("--out", default=trait_clusters.TRAIT_REMAP_PATH, help="remap file (default: TRAIT_REMAP_PATH)")
+    parser.add_argument("--dry-run", action="store_true", help="report without writing the remap")
+    parser.add_argument("--show", type=int, default=10, help="print the N largest merged clusters")
+    parser.add_argument("--no-analyses", action="store_true", help="only the vector store's labels, no database")
+    args = parser.parse_args()
+
+    t = time.perf_counter()
+    points = {}
+    for _, vector, label in qdrant_utils.get_store().scan():
+        if isinstance(label, str) and label:
+            points[label] = vector
+    print(f"loaded {len(points)} cluster labels in {time.perf_counter() - t:.2f}s")
+
+    if not args.no_analyses:
+        from embeddings import embed_texts
+
+        t = time.perf_counter()
+        unseen = sorted(cached_traits() - set(points))
+        points.update(zip(unseen, embed_texts(unseen)))
+        print(f"embedded {len(unseen)} more traits from the analysis cache in {time.perf_counter() - t:.2f}s")
+
+    labels = sorted(points)
+    vectors = np.asarray([points[label] for label in labels], dtype=np.float32).reshape(len(labels), -1)
+
+    t = time.perf_counter()
+    clusters = trait_clusters.cluster_labels(labels, vectors, threshold=args.threshold)
+    merged = sum(len(members) - 1 for members in clusters.values())
+    print(f"{len(clusters)} clusters, {merged} labels merged, in {time.perf_counter() - t:.2f}s")
+
+    biggest = sorted((m for m in clusters.values() if len(m) > 1), key=lambda m: (-len(m), m[0]))
+    for members in biggest[:args.show]:
+        print(f"  {members[0]!r} <- {', '.join(repr(m) for m in members[1:])}")
+
+    if args.dry_run:
+        return 0
+    trait_clusters.write_remap(clusters, args.threshold, args.out)
+    print(f"wrote {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Offline re-clustering of the trait vocabulary (scripts/recluster_traits.py).
+# group_traits builds clusters online, first label wins; the maintenance job
+# re-clusters every label in the vector store in one vectorized pass and writes
+# a {canonical: [members]} remap here. Request-time grouping looks known labels
+# up in it and only embeds + searches unseen ones (whose nearest label is
+# remapped too). Missing file = no remap.
+TRAIT_REMAP_PATH = os.getenv(
+    "TRAIT_REMAP_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "trait_remap.json")
+)
+TRAIT_REMAP_CHECK_SECONDS = float(os.getenv("TRAIT_REMAP_CHECK_SECONDS", "5"))
+# rows of the similarity matrix computed at a time (block x n float32)
+_BLOCK = 1024
+
+_REMAP: Dict[str, str] = {}
+_REMAP_SIG: Optional[Tuple[int, int]] = None
+_REMAP_CHECKED: Optional[float] = None
+_REMAP_LOCK = threading.Lock()
+
+
+def cluster_labels(labels: Sequence[str], vectors, threshold: float = 0.75, block: int = _BLOCK) -> Dict[str, List[str]]:
+    """
+    Star clustering over the thresholded cosine-similarity graph of `labels`.
+    Labels with the most neighbours at >= threshold become canonical first
+    (ties by label) and take every still-unassigned neighbour, so each member
+    is within `threshold` of its canonical label, as with group_trait, but
+    the result doesn't depend on the order labels arrived in.
+    Returns {canonical: [members, ...]} with singletons included.
+    """
+    n = len(labels)
+    if n == 0:
+        return {}
+    x = np.asarray(vectors, dtype=np.float32)
+    x /= np.maximum(np.linalg.norm(x, axis=1, keepdims=True), 1e-12)
+
+    # edges of the graph, block of rows at a time against the columns at or
+    # right of the block (similarity is symmetric); the n x n matrix never exists
+    rows: List[np.ndarray] = []
+    cols: List[np.ndarray] = []
+    for start in range(0, n, block):
+        sims = x[start:start + block] @ x[start:].T
+        r, c = np.nonzero(sims >= threshold)
+        keep = c > r
+        rows.append(r[keep] + start)
+        cols.append(c[keep] + start)
+    upper, lower = np.concatenate(rows), np.concatenate(cols)
+    row = np.concatenate([upper, lower])
+    col = np.concatenate([lower, upper])
+    by_row = np.argsort(row, kind="stable")
+    row, col = row[by_row], col[by_row]
+    degree = np.bincount(row, minlength=n)
+    indptr = np.concatenate([[0], np.cumsum(degree)])
+
+    by_label = np.argsort(np.asarray(labels, dtype=object), kind="stable")
+    rank = np.empty(n, dtype=np.int64)
+    rank[by_label] = np.arange(n)
+    order = np.lexsort((rank, -degree))
+
+    head = np.full(n, -1, dtype=np.int64)
+    for i in order:
+        if head[i] >= 0:
+            continue
+        head[i] = i
+        nb = col[indptr[i]:indptr[i + 1]]
+        head[nb[head[nb] < 0]] = i
+
+    clusters: Dict[str, List[str]] = {}
+    for i in order:
+        if head[i] == i:
+            clusters[labels[i]] = [labels[i]]
+    for i in range(n):
+        if head[i] != i:
+            clusters[labels[head[i]]].append(labels[i])
+    return clusters
+
+
+def write_remap(clusters: Dict[str, List[str]], threshold: float, path: str = TRAIT_REMAP_PATH):
+    # every label once: {canonical: [other members]}, singletons with []
+    body = {
+        "threshold": threshold,
+        "clusters": {
+            canonical: sorted(m for m in members if m != canonical)
+            for canonical, members in clusters.items()
+        },
+    }
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(body, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(tmp, path)  # readers see the old file or the new one, never half of one
+
+
+def load_remap(path: str = TRAIT_REMAP_PATH) -> Dict[str, str]:
+    # -> {label: canonical label} for every known label, canonical ones included
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    remap: Dict[str, str] = {}
+    for canonical, members in data["clusters"].items():
+        remap[canonical] = canonical
+        for member in members:
+            remap[member] = canonical
+    return remap
+
+
+def get_remap() -> Dict[str, str]:
+    """
+    The current remap, re-read when the file changes on disk (checked every
+    TRAIT_REMAP_CHECK_SECONDS). A broken file is logged and the previous
+    remap stays active.
+    """
+    global _REMAP, _REMAP_SIG, _REMAP_CHECKED
+    now = time.monotonic()
+    if _REMAP_CHECKED is not None and now - _REMAP_CHECKED < TRAIT_REMAP_CHECK_SECONDS:
+        return _REMAP
+    with _REMAP_LOCK:
+        _REMAP_CHECKED = now
+        try:
+            st = os.stat(TRAIT_REMAP_PATH)
+        except FileNotFoundError:
+            _REMAP, _REMAP_SIG = {}, None
+            return _REMAP
+        sig = (st.st_mtime_ns, st.st_size)
+        if sig == _REMAP_SIG:
+            return _REMAP
+        try:
+            remap = load_remap(TRAIT_REMAP_PATH)
+        except Exception as e:
+            print(f"[trait_clusters] keeping previous remap, {TRAIT_REMAP_PATH} failed to load: {e!r}")
+            _REMAP_SIG = sig
+            return _REMAP
+        print(f"[trait_clusters] remap loaded: {len(remap)} labels, {len(set(remap.values()))} clusters")
+        _REMAP, _REMAP_SIG = remap, sig
+        return _REMAP
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import threading
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+MAX_EXAMPLES = 3
+
+
+class TraitVocab:
+    """
+    Interns trait labels to dense integer ids (append-only, thread-safe).
+    Scoped to one aggregation: a process-wide one would only grow, and every
+    count array is sized to it.
+    """
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._labels: List[str] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._labels)
+
+    def id(self, label: str) -> int:
+        i = self._ids.get(label)
+        if i is None:
+            with self._lock:
+                i = self._ids.get(label)
+                if i is None:
+                    i = len(self._labels)
+                    self._labels.append(label)
+                    self._ids[label] = i
+        return i
+
+    def label(self, i: int) -> str:
+        return self._labels[i]
+
+
+def top_k_ids(counts: np.ndarray, label_of, top_k: Optional[int]) -> List[int]:
+    """
+    Ids with a non-zero count in (-count, label) order, cut to top_k
+    (None = all). argpartition narrows to the ids that can make the cut,
+    ties at the boundary included, so only those get sorted.
+    """
+    ids = np.flatnonzero(counts)
+    if top_k is not None and top_k < len(ids):
+        if top_k <= 0:
+            return []
+        vals = counts[ids]
+        kth = vals[np.argpartition(vals, len(ids) - top_k)[len(ids) - top_k]]
+        ids = ids[vals >= kth]
+    ranked = sorted(ids.tolist(), key=lambda i: (-int(counts[i]), label_of(i)))
+    return ranked[:top_k]
+
+
+def rank_traits(counts: Dict[str, int], examples: Dict[str, List[str]], top_k: Optional[int] = 8) -> List[Dict]:
+    # ranking for the string-keyed counts stored on candidate_profiles
+    labels = list(counts)
+    arr = np.fromiter(counts.values(), dtype=np.int64, count=len(labels))
+    return [
+        {"label": labels[i], "count": int(arr[i]), "examples": examples.get(labels[i], [])}
+        for i in top_k_ids(arr, labels.__getitem__, top_k)
+    ]
+
+
+class _Side:
+    # one polarity: trait id per occurrence + fixed-size example slots per id
+    def __init__(self, max_examples: int):
+        self.ids = array("q")
+        self.slots = np.empty((0, max_examples), dtype=object)
+        self.filled = np.zeros(0, dtype=np.int8)
+
+    def add(self, i: int, evidence: str):
+        self.ids.append(i)
+        if i >= len(self.filled):
+            grow = max(i + 1, 2 * len(self.filled), 16)
+            slots = np.empty((grow, self.slots.shape[1]), dtype=object)
+            slots[:len(self.slots)] = self.slots
+            filled = np.zeros(grow, dtype=np.int8)
+            filled[:len(self.filled)] = self.filled
+            self.slots, self.filled = slots, filled
+
+        n = self.filled[i]
+        if n < self.slots.shape[1] and evidence not in self.slots[i, :n]:
+            self.slots[i, n] = evidence
+            self.filled[i] = n + 1
+
+    def counts(self, size: int) -> np.ndarray:
+        return np.bincount(np.frombuffer(self.ids, dtype=np.int64), minlength=size)
+
+    def examples(self, i: int) -> List[str]:
+        if i >= len(self.filled):
+            return []
+        return list(self.slots[i, :self.filled[i]])
+
+
+class TraitCounter:
+    """
+    Array-backed (polarity, trait, evidence) aggregation: traits interned in
+    `vocab` (a fresh one per counter by default, so arrays are sized to the
+    labels this aggregation saw), counts from one np.bincount per polarity,
+    and the first `max_examples` distinct evidence strings per trait in
+    fixed slots.
+    """
+
+    def __init__(self, vocab: Optional[TraitVocab] = None, max_examples: int = MAX_EXAMPLES):
+        self.vocab = vocab if vocab is not None else TraitVocab()
+        self._pos = _Side(max_examples)
+        self._neg = _Side(max_examples)
+
+    def add(self, pol: int, label: str, evidence: str):
+        (self._pos if pol > 0 else self._neg).add(self.vocab.id(label), evidence)
+
+    def add_many(self, results: Iterable[Tuple[int, str, str]]):
+        for pol, label, evidence in results:
+            self.add(pol, label, evidence)
+
+    def top(self, positive: bool, top_k: Optional[int] = 8) -> List[Dict]:
+        side = self._pos if positive else self._neg
+        counts = side.counts(len(self.vocab))
+        return [
+            {"label": self.vocab.label(i), "count": int(counts[i]), "examples": side.examples(i)}
+            for i in top_k_ids(counts, self.vocab.label, top_k)
+        ]
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+class TraitIndex:
+    """
+    In-process mirror of the traits collection: a contiguous float32 matrix of
+    unit vectors plus the point id / label of each row. Nearest-label lookup
+    is one matrix-vector product (matrix-matrix for batches).
+
+    Rows are only ever appended; readers work on a snapshot of the first n
+    rows, so searches don't need the write lock.
+    """
+
+    def __init__(self, dim: int, capacity: int = 1024):
+        self.dim = dim
+        self._lock = threading.Lock()
+        self._matrix = np.zeros((capacity, dim), dtype=np.float32)
+        self._ids: List[int | str] = []
+        self._labels: List[str] = []
+        self._row_of: dict = {}
+        self._n = 0
+        self.loaded_at: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.loaded_at is not None
+
+    def __len__(self) -> int:
+        return self._n
+
+    def age(self) -> float:
+        return time.monotonic() - self.loaded_at if self.loaded_at is not None else float("inf")
+
+    def load(self, points: Iterable[Tuple[int | str, List[float], str]]):
+        """
+        Replaces the contents with (point_id, vector, label) triples.
+        """
+        points = list(points)
+        matrix = np.zeros((max(len(points) * 2, 1024), self.dim), dtype=np.float32)
+        ids, labels, row_of = [], [], {}
+        for i, (point_id, vector, label) in enumerate(points):
+            matrix[i] = _unit(vector)
+            ids.append(point_id)
+            labels.append(label)
+            row_of[point_id] = i
+
+        with self._lock:
+            self._matrix, self._ids, self._labels, self._row_of = matrix, ids, labels, row_of
+            self._n = len(points)
+            self.loaded_at = time.monotonic()
+
+    def add(self, point_id: int | str, vector: List[float], label: str):
+        """
+        Mirrors an upsert: overwrites the row of an existing id, else appends.
+        """
+        with self._lock:
+            row = self._row_of.get(point_id)
+            if row is not None:
+                self._matrix[row] = _unit(vector)
+                self._labels[row] = label
+                return
+
+            if self._n == len(self._matrix):
+                grown = np.zeros((len(self._matrix) * 2, self.dim), dtype=np.float32)
+                grown[: self._n] = self._matrix[: self._n]
+                self._matrix = grown
+
+            self._matrix[self._n] = _unit(vector)
+            self._ids.append(point_id)
+            self._labels.append(label)
+            self._row_of[point_id] = self._n
+            self._n += 1
+
+    def snapshot(self) -> Tuple[List[int | str], np.ndarray, List[str]]:
+        # (ids, unit vectors, labels) of the current rows
+        with self._lock:
+            n = self._n
+            return list(self._ids[:n]), self._matrix[:n].copy(), list(self._labels[:n])
+
+    def search(self, vector: List[float], limit: int = 1) -> List[Tuple[int | str, float, str]]:
+        return self.search_batch([vector], limit=limit)[0]
+
+    def search_batch(self, vectors: List[List[float]], limit: int = 1) -> List[List[Tuple[int | str, float, str]]]:
+        """
+        Returns, per query vector, up to `limit` (point_id, cosine score, label)
+        triples, best first.
+        """
+        n, matrix, ids, labels = self._n, self._matrix, self._ids, self._labels
+        if not vectors:
+            return []
+        if n == 0:
+            return [[] for _ in vectors]
+
+        queries = np.stack([_unit(v) for v in vectors])
+        scores = queries @ matrix[:n].T  # (queries, n)
+
+        k = min(limit, n)
+        if k == 1:
+            top = scores.argmax(axis=1)[:, None]
+        else:
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            order = np.take_along_axis(-scores, top, axis=1).argsort(axis=1, kind="stable")
+            top = np.take_along_axis(top, order, axis=1)
+
+        return [
+            [(ids[j], float(scores[q, j]), labels[j]) for j in top[q]]
+            for q in range(len(vectors))
+        ]
+
+
+def _unit(vector) -> np.ndarray:
+    v = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(v))
+    return v / norm if norm > 0 else v
@@ -0,0 +1,464 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+from circuit_breaker import CircuitBreaker, CircuitOpen
+from trait_index import TraitIndex
+
+try:
+    import fcntl
+except ImportError:  # Windows dev boxes: no cross-process locking
+    fcntl = None
+
+PointId = Union[int, str]  # pre-uuid collections still hold integer ids
+Point = Tuple[PointId, List[float], str]  # (point_id, vector, label)
+Hit = Tuple[PointId, float, str]  # (point_id, cosine score, label)
+
+
+def op_stats(counters: Dict[str, float]) -> Dict:
+    # per op: calls, errors, calls rejected by an open breaker, mean latency in ms
+    ops: Dict[str, Dict] = {}
+    for key, value in counters.items():
+        op, field = key.rsplit(".", 1)
+        ops.setdefault(op, {"calls": 0, "errors": 0, "rejected": 0, "seconds": 0.0})[field] = value
+    return {
+        op: {
+            "calls": int(v["calls"]),
+            "errors": int(v["errors"]),
+            "rejected": int(v["rejected"]),
+            "mean_ms": round(1000 * v["seconds"] / v["calls"], 3) if v["calls"] else None,
+        }
+        for op, v in sorted(ops.items())
+    }
+
+
+class VectorStore:
+    """
+    What trait grouping needs from a vector store: nearest labels for one or
+    many vectors, upsert, full scan and reset. Scores are cosine similarity.
+    """
+
+    # whether qdrant_utils should mirror it into an in-process TraitIndex
+    mirror = True
+    # set on stores that talk to a server that can go away
+    breaker: Optional[CircuitBreaker] = None
+
+    def __init__(self):
+        # "<op>.calls" / "<op>.seconds" / "<op>.errors"; plain sums so
+        # counters from worker processes can be added in
+        self._counters: Dict[str, float] = {}
+        self._counter_lock = threading.Lock()
+
+    @contextmanager
+    def _timed(self, op: str):
+        t = time.perf_counter()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            with self._counter_lock:
+                c = self._counters
+                c[f"{op}.calls"] = c.get(f"{op}.calls", 0) + 1
+                c[f"{op}.seconds"] = c.get(f"{op}.seconds", 0.0) + time.perf_counter() - t
+                if not ok:
+                    c[f"{op}.errors"] = c.get(f"{op}.errors", 0) + 1
+
+    def _count(self, key: str):
+        with self._counter_lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+
+    def counters(self) -> Dict[str, float]:
+        with self._counter_lock:
+            return dict(self._counters)
+
+    def add_counters(self, delta: Dict[str, float]):
+        with self._counter_lock:
+            for k, v in delta.items():
+                self._counters[k] = self._counters.get(k, 0) + v
+
+    def stats(self) -> Dict:
+        return op_stats(self.counters())
+
+    def flush(self):
+        pass
+
+    def search_batch(self, vectors: List[List[float]], limit: int = 1) -> List[List[Hit]]:
+        raise NotImplementedError
+
+    def search(self, vector: List[float], limit: int = 1) -> List[Hit]:
+        return self.search_batch([vector], limit=limit)[0]
+
+    def upsert(self, points: List[Point]):
+        raise NotImplementedError
+
+    def scan(self) -> Iterator[Point]:
+        raise NotImplementedError
+
+    def reset(self):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class QdrantStore(VectorStore):
+    """
+    One Qdrant collection. `client_kwargs` go to QdrantClient, so the same
+    class covers a remote server (url=..., optionally over gRPC) and
+    qdrant-client's local mode (location=":memory:" or path=...; one
+    process per path).
+
+    The collection is checked/created once and remembered. Upserts are
+    buffered (keyed by point id) and written in batches of `write_batch`,
+    or `write_delay` seconds after the first buffered point; searches
+    flush first, so this process always reads its own writes.
+
+    Every call goes through `breaker`: once the server has failed several
+    times in a row, calls raise CircuitOpen at once instead of each waiting
+    out the client timeout, until a probe call gets through again. Buffered
+    upserts are kept (and retried) while it is open.
+    """
+
+    def __init__(
+        self, collection: str, dim: int, write_batch: int = 64, write_delay: float = 0.2,
+        breaker: Optional[CircuitBreaker] = None, **client_kwargs,
+    ):
+        super().__init__()
+        from qdrant_client import QdrantClient
+
+        self.collection = collection
+        self.dim = dim
+        self.client = QdrantClient(**client_kwargs)
+        self.breaker = breaker or CircuitBreaker(f"qdrant:{collection}")
+        self.write_batch = write_batch
+        self.write_delay = write_delay
+        self._ready = False
+        self._ready_lock = threading.Lock()
+        self._pending: Dict[PointId, Point] = {}
+        self._pending_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+
+    def ensure_collection(self):
+        if self._ready:
+            return
+        from qdrant_client.http import models as qm
+
+        with self._ready_lock:
+            if self._ready:
+                return
+            with self._timed("ensure_collection"):
+                if not self.client.collection_exists(self.collection):
+                    self.client.create_collection(
+                        collection_name=self.collection,
+                        vectors_config=qm.VectorParams(size=self.dim, distance=qm.Distance.COSINE),
+                    )
+            self._ready = True
+
+    def _call(self, op: str, fn, *args, **kwargs):
+        if not self.breaker.allow():
+            self._count(f"{op}.rejected")
+            raise CircuitOpen(f"{self.breaker.name} unavailable (circuit open)")
+        try:
+            result = self._attempt(op, fn, *args, **kwargs)
+        except Exception:
+            self.breaker.failure()
+            raise
+        self.breaker.success()
+        return result
+
+    def _attempt(self, op: str, fn, *args, **kwargs):
+        self.ensure_collection()
+        try:
+            with self._timed(op):
+                return fn(*args, **kwargs)
+        except Exception as e:
+            # dropped behind our back (another worker's reset): recreate once and retry
+            if "not found" not in str(e).lower():
+                raise
+            self._ready = False
+            self.ensure_collection()
+            with self._timed(op):
+                return fn(*args, **kwargs)
+
+    @staticmethod
+    def _hits(points) -> List[Hit]:
+        return [(p.id, p.score, (p.payload or {}).get("label")) for p in points]
+
+    def search(self, vector: List[float], limit: int = 1) -> List[Hit]:
+        self.flush()
+        res = self._call(
+            "search",
+            self.client.query_points,
+            collection_name=self.collection,
+            query=vector,
+            limit=limit,
+            with_payload=True,
+        )
+        # res is a QueryResponse with .points
+        return self._hits(res.points)
+
+    def search_batch(self, vectors: List[List[float]], limit: int = 1) -> List[List[Hit]]:
+        # one round trip for many lookups; results line up with `vectors`
+        from qdrant_client.http import models as qm
+
+        if not vectors:
+            return []
+        self.flush()
+        res = self._call(
+            "search_batch",
+            self.client.query_batch_points,
+            collection_name=self.collection,
+            requests=[
+                qm.QueryRequest(query=vector, limit=limit, with_payload=True)
+                for vector in vectors
+            ],
+        )
+        return [self._hits(r.points) for r in res]
+
+    def upsert(self, points: List[Point]):
+        if not points:
+            return
+        with self._pending_lock:
+            for p in points:
+                self._pending[p[0]] = p
+            full = len(self._pending) >= self.write_batch or self.write_delay <= 0
+            if not full and self._timer is None:
+                self._timer = threading.Timer(self.write_delay, self._flush_in_background)
+                self._timer.daemon = True
+                self._timer.start()
+        if full:
+            self.flush()
+
+    def _flush_in_background(self):
+        try:
+            self.flush()
+        except CircuitOpen:
+            pass  # still down; the retry timer is already set
+        except Exception as e:
+            print(f"[vector_store] buffered upsert failed, will retry: {e!r}")
+
+    def flush(self):
+        from qdrant_client.http import models as qm
+
+        with self._flush_lock:
+            with self._pending_lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                points, self._pending = list(self._pending.values()), {}
+            for start in range(0, len(points), self.write_batch):
+                batch = points[start:start + self.write_batch]
+                try:
+                    self._call(
+                        "upsert",
+                        self.client.upsert,
+                        collection_name=self.collection,
+                        points=[
+                            qm.PointStruct(id=point_id, vector=vector, payload={"label": label})
+                            for point_id, vector, label in batch
+                        ],
+                    )
+                except Exception:
+                    # put back what wasn't written (newer buffered versions win) and retry later
+                    with self._pending_lock:
+                        for p in points[start:]:
+                            self._pending.setdefault(p[0], p)
+                        if self._timer is None and self.write_delay > 0:
+                            self._timer = threading.Timer(max(self.write_delay, 1.0), self._flush_in_background)
+                            self._timer.daemon = True
+                            self._timer.start()
+                    raise
+
+    def scan(self) -> Iterator[Point]:
+        self.flush()
+        offset = None
+        while True:
+            batch, offset = self._call(
+                "scroll",
+                self.client.scroll,
+                collection_name=self.collection,
+                limit=1000,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True,
+            )
+            for p in batch:
+                yield p.id, p.vector, (p.payload or {}).get("label")
+            if offset is None:
+                break
+
+    def reset(self):
+        with self._pending_lock:
+            self._pending = {}
+        with self._timed("reset"):
+            if self.client.collection_exists(self.collection):
+                self.client.delete_collection(collection_name=self.collection)
+        self._ready = False
+        self.ensure_collection()
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            # local mode holds a file lock on its path until closed
+            self.client.close()
+
+
+class NumpyStore(VectorStore):
+    """
+    Pure NumPy store: a TraitIndex, optionally persisted to one .npz file.
+    With a path, writes merge with what other processes saved (under an
+    fcntl lock) and searches pick up their writes when the file changes.
+    Without one it lives and dies with the process (tests, benchmarks).
+    """
+
+    mirror = False  # already in memory
+
+    def __init__(self, dim: int, path: Optional[str] = None):
+        super().__init__()
+        self.dim = dim
+        self.path = path or None
+        self._index = TraitIndex(dim)
+        self._index.load([])
+        self._sig: Optional[Tuple[int, int]] = None
+        if self.path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._refresh()
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_mtime_ns
+
+    def _refresh(self):
+        sig = self._stat()
+        if sig is None or sig == self._sig:
+            return
+        with np.load(self.path, allow_pickle=False) as data:
+            ids = [int(i) if i.isdigit() else i for i in data["ids"].tolist()]
+            points = list(zip(ids, data["vectors"], data["labels"].tolist()))
+        self._index.load(points)
+        self._sig = sig
+
+    def _save(self):
+        ids, vectors, labels = self._index.snapshot()
+        tmp = f"{self.path}.tmp-{os.getpid()}"
+        with open(tmp, "wb") as f:
+            np.savez(f, ids=np.array([str(i) for i in ids]), vectors=vectors, labels=np.array(labels))
+        os.replace(tmp, self.path)
+        self._sig = self._stat()
+
+    def _locked(self):
+        return _FileLock(f"{self.path}.lock") if self.path else _FileLock(None)
+
+    def search_batch(self, vectors: List[List[float]], limit: int = 1) -> List[List[Hit]]:
+        with self._timed("search_batch"):
+            if self.path:
+                self._refresh()
+            return self._index.search_batch(vectors, limit=limit)
+
+    def upsert(self, points: List[Point]):
+        if not points:
+            return
+        with self._timed("upsert"), self._locked():
+            if self.path:
+                self._refresh()
+            for point_id, vector, label in points:
+                self._index.add(point_id, vector, label)
+            if self.path:
+                self._save()
+
+    def scan(self) -> Iterator[Point]:
+        if self.path:
+            self._refresh()
+        ids, vectors, labels = self._index.snapshot()
+        for point_id, vector, label in zip(ids, vectors, labels):
+            yield point_id, vector.tolist(), label
+
+    def reset(self):
+        with self._locked():
+            self._index.load([])
+            if self.path:
+                self._save()
+
+
+class _FileLock:
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self._f = None
+
+    def __enter__(self):
+        if self.path and fcntl is not None:
+            self._f = open(self.path, "a")
+            fcntl.flock(self._f, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self._f is not None:
+            fcntl.flock(self._f, fcntl.LOCK_UN)
+            self._f.close()
+            self._f = None
+
+
+def from_config(collection: str, dim: int) -> VectorStore:
+    """
+    VECTOR_BACKEND selects the store:
+      qdrant        remote server at QDRANT_URL (default), REST unless
+                    QDRANT_PREFER_GRPC=1 (gRPC on QDRANT_GRPC_PORT, which
+                    must be published too), QDRANT_TIMEOUT seconds per call
+      qdrant-local  qdrant-client local mode at QDRANT_PATH (":memory:" or a directory)
+      numpy         NumpyStore, persisted to VECTOR_STORE_PATH if set
+    QDRANT_WRITE_BATCH / QDRANT_WRITE_DELAY_SECONDS tune upsert buffering
+    (delay 0 writes synchronously). The Qdrant backends open their breaker
+    after VECTOR_BREAKER_FAILURES consecutive failures and probe again
+    every VECTOR_BREAKER_RESET_SECONDS.
+    qdrant-local and a pathless numpy store belong to the process that opens
+    them; see single_process_backend.
+    """
+    backend = os.getenv("VECTOR_BACKEND", "qdrant")
+    options = {
+        "write_batch": int(os.getenv("QDRANT_WRITE_BATCH", "64")),
+        "write_delay": float(os.getenv("QDRANT_WRITE_DELAY_SECONDS", "0.2")),
+        "breaker": CircuitBreaker(
+            f"qdrant:{collection}",
+            failures=int(os.getenv("VECTOR_BREAKER_FAILURES", "3")),
+            reset_seconds=float(os.getenv("VECTOR_BREAKER_RESET_SECONDS", "30")),
+        ),
+    }
+    if backend == "qdrant":
+        return QdrantStore(
+            collection, dim, **options,
+            url=os.getenv("QDRANT_URL", "http://127.0.0.1:6333"),
+            prefer_grpc=os.getenv("QDRANT_PREFER_GRPC", "0") == "1",
+            grpc_port=int(os.getenv("QDRANT_GRPC_PORT", "6334")),
+            timeout=float(os.getenv("QDRANT_TIMEOUT", "5")),
+        )
+    if backend == "qdrant-local":
+        path = os.getenv("QDRANT_PATH", ":memory:")
+        if path == ":memory:":
+            return QdrantStore(collection, dim, **options, location=":memory:")
+        return QdrantStore(collection, dim, **options, path=path)
+    if backend == "numpy":
+        return NumpyStore(dim, path=os.getenv("VECTOR_STORE_PATH", ""))
+    raise ValueError(f"unknown VECTOR_BACKEND {backend!r} (expected 'qdrant', 'qdrant-local' or 'numpy')")
+
+
+def single_process_backend() -> bool:
+    """
+    True when VECTOR_BACKEND can only be used from one process: qdrant-local
+    (an embedded path is locked by the process that opens it, ":memory:" is
+    private to it) and numpy without VECTOR_STORE_PATH. profile_pool then
+    groups traits in the API process instead of in its workers.
+    """
+    backend = os.getenv("VECTOR_BACKEND", "qdrant")
+    return backend == "qdrant-local" or (backend == "numpy" and not os.getenv("VECTOR_STORE_PATH"))
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Tuple
+
+_T0 = time.perf_counter()  # ~ process import time; main imports this early
+
+# "1": load models in a background thread at startup and gate /ready on it
+# "0": load lazily on first NLP use; /ready is always ready
+EAGER_LOAD_MODELS = os.getenv("EAGER_LOAD_MODELS", "1") == "1"
+
+# a small but representative mix: short slang, contrast clauses, negatives
+_WARMUP_SUBMISSIONS: List[Tuple[int, str]] = [
+    (1, "chiller"),
+    (1, "Really nice guy, easy to talk to and a natural leader."),
+    (-1, "He is funny but he talks over people and seemed kind of arrogant."),
+    (1, "Works hard and always on time, though sometimes a bit quiet."),
+    (-1, "rude"),
+]
+# what the analysis above yields, for a process that only groups
+_WARMUP_TRAITS = ["chill", "nice", "funny", "arrogant", "hard working", "quiet", "rude"]
+
+_lock = threading.Lock()
+_ready = threading.Event()
+_started = False
+timings: Dict[str, float] = {}
+errors: Dict[str, str] = {}
+
+
+def components(analysis: bool = True, grouping: bool = True) -> List[Tuple[str, Callable, bool]]:
+    # (name, loader, required for readiness) of the selected stages: comment
+    # analysis (spaCy, VADER) and/or trait grouping (embeddings, vector store)
+    import embeddings
+    import nlp
+    import qdrant_utils
+    import trait_clusters
+
+    out: List[Tuple[str, Callable, bool]] = []
+    if analysis:
+        out += [
+            ("spacy", nlp.get_nlp, True),
+            ("vader", nlp.get_vader, True),
+            ("synonyms", nlp.get_synonyms, True),
+        ]
+    if not grouping:
+        return out
+    return out + [
+        ("trait_remap", trait_clusters.get_remap, False),
+        ("embedding_model", embeddings.get_model, True),
+        ("embedding_cache", embeddings.get_cache, False),
+        ("vector_store", qdrant_utils.get_store, False),
+        ("trait_index", qdrant_utils.load_trait_index if qdrant_utils.TRAIT_INDEX_ENABLED else (lambda: None), False),
+    ]
+
+
+def run_warmup(analysis: bool = True, grouping: bool = True):
+    """
+    Runs the selected stages of the profile pipeline on a few canned
+    submissions so first-request costs (lazy spaCy/torch init, allocator
+    growth) are paid up front. Mirrors build_profile but only *searches* the
+    trait collection, so warmup never creates clusters.
+    """
+    import embeddings
+    import nlp
+    import qdrant_utils
+
+    traits = _WARMUP_TRAITS
+    if analysis:
+        analyses = nlp.analyze_submissions(_WARMUP_SUBMISSIONS)
+        traits = list(dict.fromkeys(t for results in analyses for _, t, _ in results))
+    if not grouping:
+        return
+    vecs = embeddings.embed_texts(traits)
+    try:
+        qdrant_utils.search_traits(vecs, limit=1)
+    except Exception as e:
+        errors["warmup_search"] = repr(e)
+
+
+def load_all():
+    """
+    Loads the components this process uses, then warms up. With a profile
+    pool that is nothing of the comment analysis (the workers load it) and
+    trait grouping only when the vector store can't leave this process
+    (profile_pool.in_process). Records per-component seconds in `timings`
+    and prints a startup report; failures of optional components (Qdrant)
+    and of the warmup run itself are recorded but don't block readiness.
+    """
+    import profile_pool
+
+    analysis, grouping = profile_pool.in_process()
+    ok = True
+    for name, loader, required in components(analysis, grouping):
+        t = time.perf_counter()
+        try:
+            loader()
+        except Exception as e:
+            errors[name] = repr(e)
+            ok = ok and not required
+        timings[name] = round(time.perf_counter() - t, 3)
+
+    if ok and (analysis or grouping):
+        t = time.perf_counter()
+        try:
+            run_warmup(analysis, grouping)
+        except Exception as e:
+            errors["warmup"] = repr(e)
+        timings["warmup"] = round(time.perf_counter() - t, 3)
+
+    timings["import_to_ready"] = round(time.perf_counter() - _T0, 3)
+    for name, seconds in timings.items():
+        status = f"FAILED {errors[name]}" if name in errors else "ok"
+        print(f"[startup] {name:<16} {seconds:7.3f}s  {status}")
+
+    if ok:
+        _ready.set()
+
+
+def start_background():
+    global _started
+    with _lock:
+        if _started:
+            return
+        _started = True
+    threading.Thread(target=load_all, name="model-warmup", daemon=True).start()
+
+
+def is_ready() -> bool:
+    # this process and every profile pool worker have their models loaded
+    import profile_pool
+
+    return (_ready.is_set() and profile_pool.is_ready()) or not EAGER_LOAD_MODELS
+
+
+def status() -> Dict:
+    import profile_pool
+
+    return {
+        "ready": is_ready(),
+        "mode": "eager" if EAGER_LOAD_MODELS else "lazy",
+        "pool_workers_ready": f"{profile_pool.workers_ready()}/{max(profile_pool.PROFILE_POOL_SIZE, 0)}",
+        "timings": dict(timings),
+        "errors": dict(errors),
+    }
@@ -6,13 +6,19 @@ import { apiDelete, apiGet, apiPatch, apiPost } from "@/lib/api";
 import { Badge, Button, Card, CardBody, Pill } from "../components/ui";
 import { useUser } from "@clerk/nextjs";
 
-type Candidate = { id: number; name: string; created_at: string };
-type Submission = {
+type Votes = {
+  yes: number;
+  neutral: number;
+  no: number;
+  score: number;
+  total: number;
+  comments: number;
+};
+type Candidate = {
   id: number;
-  candidate_id: number;
-  vote: number;
-  comment: string;
+  name: string;
   created_at: string;
+  votes?: Votes | null;
 };
 
 function approval(yes: number, no: number) {
@@ -30,7 +36,6 @@ export default function CandidatesClient() {
   : {};
 
   const [candidates, setCandidates] = useState<Candidate[]>([]);
-  const [subsById, setSubsById] = useState<Record<number, Submission[]>>({});
   const [newName, setNewName] = useState("");
   const [editingId, setEditingId] = useState<number | null>(null);
   const [editName, setEditName] = useState("");
@@ -43,24 +48,11 @@ export default function CandidatesClient() {
 
   async function load() {
     setMsg(null);
-    const list = await apiGet<Candidate[]>("/candidates", { headers });
+    // vote counts come with the list, in one request
+    const list = await apiGet<Candidate[]>("/candidates?summary=true", {
+      headers,
+    });
     setCandidates(list);
-
-    const entries = await Promise.all(
-      list.map(
-        async (c) =>
-          [
-            c.id,
-            await apiGet<Submission[]>(`/candidates/${c.id}/submissions`, {
-              headers,
-            }),
-          ] as const
-      )
-    );
-
-    const map: Record<number, Submission[]> = {};
-    for (const [id, subs] of entries) map[id] = subs;
-    setSubsById(map);
   }
 
   useEffect(() => {
@@ -155,10 +147,10 @@ export default function CandidatesClient() {
       {/* List */}
       <div className="mt-8 grid gap-5">
         {candidates.map((c) => {
-          const subs = subsById[c.id] ?? [];
-          const yes = subs.filter((s) => s.vote === 1).length;
-          const neu = subs.filter((s) => s.vote === 0).length;
-          const no = subs.filter((s) => s.vote === -1).length;
+          const yes = c.votes?.yes ?? 0;
+          const neu = c.votes?.neutral ?? 0;
+          const no = c.votes?.no ?? 0;
+          const total = c.votes?.total ?? 0;
           const pct = approval(yes, no);
 
           const isEditing = editingId === c.id;
@@ -187,7 +179,7 @@ export default function CandidatesClient() {
                   </div>
 
                   <div className="flex items-center gap-2">
-                    <Pill>{subs.length} votes</Pill>
+                    <Pill>{total} votes</Pill>
 
                     <Button
                       variant="outline"
@@ -5,11 +5,11 @@ import { useEffect, useMemo, useState } from "react";
 import { useParams } from "next/navigation";
 import { UserButton, useUser } from "@clerk/nextjs";
 import { Badge, Card, CardBody, Pill } from "@/app/components/ui";
-import { apiDelete, apiGet, apiPost } from "@/lib/api";
+import { apiDelete, apiEvents, apiGet, apiPost } from "@/lib/api";
 
 type EventRow = { id: number; name: string; description?: string | null; created_at: string };
-type Candidate = { id: number; name: string; description?: string | null; photo?: string | null; created_at: string };
-type Submission = { id: number; candidate_id: number; user_id: string; vote: number; comment: string; created_at: string };
+type Votes = { yes: number; neutral: number; no: number; score: number; total: number; comments: number; my_vote: number | null; my_comment: string | null };
+type Candidate = { id: number; name: string; description?: string | null; photo?: string | null; created_at: string; votes?: Votes | null };
 type Member = { id: number; user_id: string; role: string; created_at: string };
 type Invite = { id: number; event_id: number; email: string; role: string; token: string; invited_by: string; accepted_at: string | null; created_at: string };
 
@@ -47,7 +47,6 @@ export default function EventDetailPage() {
   const [event, setEvent]               = useState<EventRow | null>(null);
   const [userRole, setUserRole]         = useState<string | null>(null);
   const [candidates, setCandidates]     = useState<Candidate[]>([]);
-  const [subsById, setSubsById]         = useState<Record<number, Submission[]>>({});
   const [search, setSearch]             = useState("");
   const [confirmDelete, setConfirmDelete] = useState<{ id: number; name: string } | null>(null);
   const [votingId, setVotingId]         = useState<number | null>(null);
@@ -78,14 +77,9 @@ export default function EventDetailPage() {
 
   async function loadCandidates() {
     setMsg(null);
-    const list = await apiGet<Candidate[]>(`/events/${encodeURIComponent(String(eventId))}/candidates`, { headers });
+    // vote counts and my own vote come with the list, in one request
+    const list = await apiGet<Candidate[]>(`/events/${encodeURIComponent(String(eventId))}/candidates?summary=true`, { headers });
     setCandidates(list);
-    const entries = await Promise.all(
-      list.map(async (c) => [c.id, await apiGet<Submission[]>(`/candidates/${c.id}/submissions`, { headers })] as const)
-    );
-    const map: Record<number, Submission[]> = {};
-    for (const [id, subs] of entries) map[id] = subs;
-    setSubsById(map);
   }
 
   async function loadMembers() {
@@ -113,6 +107,41 @@ export default function EventDetailPage() {
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, [eventId, isLoaded, userId]);
 
+  // Live updates: the server pushes a delta per write instead of us polling.
+  // Vote counts are patched in place; anything else refetches (ETags keep that cheap).
+  useEffect(() => {
+    if (!isLoaded || !userId) return;
+    const ctrl = new AbortController();
+    function onEvent(type: string, data: unknown) {
+      if (type === "votes") {
+        const d = data as { candidate_id: number; votes: Omit<Votes, "my_vote" | "my_comment"> };
+        setCandidates((prev) => prev.map((c) => c.id !== d.candidate_id ? c : {
+          ...c,
+          votes: { ...d.votes, my_vote: c.votes?.my_vote ?? null, my_comment: c.votes?.my_comment ?? null },
+        }));
+      } else if (type === "candidate" || type === "resync") {
+        loadCandidates().catch(() => {});
+      } else if (type === "members") {
+        loadEventMeta().catch(() => {});
+      }
+    }
+    (async () => {
+      while (!ctrl.signal.aborted) {
+        try {
+          await apiEvents(`/events/${eventId}/live`, onEvent, { headers, signal: ctrl.signal });
+        } catch {
+          // dropped or refused; retry below
+        }
+        if (ctrl.signal.aborted) break;
+        // we may have missed deltas while disconnected
+        loadCandidates().catch(() => {});
+        await new Promise((r) => setTimeout(r, 3000));
+      }
+    })();
+    return () => ctrl.abort();
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [eventId, isLoaded, userId]);
+
   async function confirmDeleteNow() {
     if (!confirmDelete) return;
     await apiDelete(`/candidates/${confirmDelete.id}`, { headers });
@@ -121,9 +150,8 @@ export default function EventDetailPage() {
   }
 
   function openVote(c: Candidate) {
-    const existing = (subsById[c.id] ?? []).find((s) => s.user_id === userId);
-    setVoteValue(existing?.vote ?? 1);
-    setVoteComment(existing?.comment ?? "");
+    setVoteValue(c.votes?.my_vote ?? 1);
+    setVoteComment(c.votes?.my_comment ?? "");
     setVotingId(c.id);
   }
 
@@ -255,12 +283,12 @@ export default function EventDetailPage() {
           )}
 
           {filteredCandidates.map((c) => {
-            const subs   = subsById[c.id] ?? [];
-            const yes    = subs.filter((s) => s.vote === 1).length;
-            const neu    = subs.filter((s) => s.vote === 0).length;
-            const no     = subs.filter((s) => s.vote === -1).length;
+            const yes    = c.votes?.yes ?? 0;
+            const neu    = c.votes?.neutral ?? 0;
+            const no     = c.votes?.no ?? 0;
+            const total  = c.votes?.total ?? 0;
             const pct    = approval(yes, no);
-            const myVote = subs.find((s) => s.user_id === userId);
+            const myVote = c.votes?.my_vote ?? null;
             const isVoting = votingId === c.id;
 
             return (
@@ -272,14 +300,14 @@ export default function EventDetailPage() {
                     </div>
                     <div className="flex-1 min-w-0">
                       <div className="text-lg font-bold truncate">{c.name}</div>
-                      <div className="text-xs text-slate-500">{subs.length} vote{subs.length !== 1 ? "s" : ""}</div>
+                      <div className="text-xs text-slate-500">{total} vote{total !== 1 ? "s" : ""}</div>
                     </div>
                     <div className="flex items-center gap-2 shrink-0">
                       {/* Vote */}
                       {myVote != null ? (
                         <button onClick={() => isVoting ? setVotingId(null) : openVote(c)}
-                          className={`rounded-xl px-3 py-1.5 text-sm font-semibold transition flex items-center gap-1.5 ${isVoting ? "bg-white/10 text-slate-300" : myVote.vote === 1 ? "bg-emerald-500/20 text-emerald-300 border border-emerald-500/30 hover:bg-emerald-500/30" : myVote.vote === -1 ? "bg-rose-500/20 text-rose-300 border border-rose-500/30 hover:bg-rose-500/30" : "bg-amber-500/20 text-amber-300 border border-amber-500/30 hover:bg-amber-500/30"}`}>
-                          {myVote.vote === 1 ? "👍" : myVote.vote === -1 ? "👎" : "😐"}<span>{isVoting ? "Cancel" : "Voted"}</span>
+                          className={`rounded-xl px-3 py-1.5 text-sm font-semibold transition flex items-center gap-1.5 ${isVoting ? "bg-white/10 text-slate-300" : myVote === 1 ? "bg-emerald-500/20 text-emerald-300 border border-emerald-500/30 hover:bg-emerald-500/30" : myVote === -1 ? "bg-rose-500/20 text-rose-300 border border-rose-500/30 hover:bg-rose-500/30" : "bg-amber-500/20 text-amber-300 border border-amber-500/30 hover:bg-amber-500/30"}`}>
+                          {myVote === 1 ? "👍" : myVote === -1 ? "👎" : "😐"}<span>{isVoting ? "Cancel" : "Voted"}</span>
                         </button>
                       ) : (
                         <button onClick={() => openVote(c)} className="rounded-xl bg-indigo-600/80 px-3 py-1.5 text-sm font-semibold text-white hover:bg-indigo-500 transition">Vote</button>
@@ -3,20 +3,42 @@ const API_BASE =
 
 type Extra = { headers?: Record<string, string> };
 
+// Last body + ETag per GET (and caller identity). Revalidated with
+// If-None-Match on every call; a 304 reuses the body without the API
+// rebuilding or re-sending it.
+const ETAG_CACHE_SIZE = 200;
+const etagCache = new Map<string, { etag: string; body: unknown }>();
+
 /**
  * GET helper
  */
 export async function apiGet<T>(path: string, extra: Extra = {}): Promise<T> {
+  const key = `${extra.headers?.["X-User-Id"] ?? ""} ${path}`;
+  const cached = etagCache.get(key);
   const res = await fetch(`${API_BASE}${path}`, {
     cache: "no-store",
-    headers: extra.headers,
+    headers: cached
+      ? { ...(extra.headers ?? {}), "If-None-Match": cached.etag }
+      : extra.headers,
   });
 
+  if (res.status === 304 && cached) {
+    return cached.body as T;
+  }
   if (!res.ok) {
     throw new Error(`GET ${path} failed with ${res.status}`);
   }
 
-  return res.json();
+  const body = await res.json();
+  const etag = res.headers.get("ETag");
+  etagCache.delete(key);
+  if (etag) {
+    etagCache.set(key, { etag, body });
+    if (etagCache.size > ETAG_CACHE_SIZE) {
+      etagCache.delete(etagCache.keys().next().value as string);
+    }
+  }
+  return body;
 }
 
 /**
@@ -63,4 +85,42 @@ export async function apiDelete(path: string, extra: Extra = {}): Promise<void>
     headers: extra.headers,
   });
   if (!res.ok) throw new Error(`DELETE ${path} failed with ${res.status}`);
-}
\ No newline at end of file
+}
+/**
+ * Server-sent events over fetch (EventSource can't send X-User-Id).
+ * Calls onEvent for every event until the stream ends or `signal` aborts.
+ */
+export async function apiEvents(
+  path: string,
+  onEvent: (event: string, data: unknown) => void,
+  extra: Extra & { signal?: AbortSignal } = {}
+): Promise<void> {
+  const res = await fetch(`${API_BASE}${path}`, {
+    cache: "no-store",
+    headers: { Accept: "text/event-stream", ...(extra.headers ?? {}) },
+    signal: extra.signal,
+  });
+  if (!res.ok || !res.body) {
+    throw new Error(`GET ${path} failed with ${res.status}`);
+  }
+
+  const reader = res.body.pipeThrough(new TextDecoderStream()).getReader();
+  let buffer = "";
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) return;
+    buffer += value;
+    let end: number;
+    while ((end = buffer.indexOf("\n\n")) >= 0) {
+      const block = buffer.slice(0, end);
+      buffer = buffer.slice(end + 2);
+      let event = "message";
+      const data: string[] = [];
+      for (const line of block.split("\n")) {
+        if (line.startsWith("event:")) event = line.slice(6).trim();
+        else if (line.startsWith("data:")) data.push(line.slice(5).trimStart());
+      }
+      if (data.length) onEvent(event, JSON.parse(data.join("\n")));
+    }
+  }
+}